@@ -41,6 +41,15 @@ GEMINI_PRICING = {
     "gemini-3-flash-preview": {"input": 0.50, "output": 3.00},
     "gemini-3.1-pro-preview": {"input": 2.00, "output": 12.00},
 }
+# Client-side pacing per model (requests/min, tokens/min); stay under the
+# account's quota so calls queue locally instead of coming back as 429s.
+# 0 disables that limit.
+GEMINI_RPM_DEFAULT = int(os.getenv("GEMINI_RPM", "150"))
+GEMINI_TPM_DEFAULT = int(os.getenv("GEMINI_TPM", "1000000"))
+GEMINI_RATE_LIMITS = {
+    "gemini-3-flash-preview": {"rpm": 1000, "tpm": 1_000_000},
+    "gemini-3.1-pro-preview": {"rpm": 150, "tpm": 2_000_000},
+}
 
 # Presence
 PRESENCE_URL = os.getenv("PRESENCE_URL", "wss://jarvis-presence-htl4ur3tvq-uc.a.run.app")
@@ -1,18 +1,38 @@
+import asyncio
+
 import httpx
 
 
 class HTTPConnector:
-    """Async HTTP client for project APIs."""
+    """Async HTTP client for project APIs.
+
+    One pooled AsyncClient is kept per connector so repeated calls reuse
+    keep-alive connections instead of reconnecting every request.
+    """
 
     def __init__(self, base_url: str, timeout: float = 5.0):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        self._client: httpx.AsyncClient | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        return self._client
 
     async def get(self, path: str, params: dict = None) -> dict | None:
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                resp = await client.get(f"{self.base_url}{path}", params=params)
-                resp.raise_for_status()
-                return resp.json()
-        except (httpx.ConnectError, httpx.TimeoutException, httpx.HTTPStatusError):
+            # httpx timeouts are per phase; bound the whole call as well so a
+            # slow-drip response can't stall the caller past `timeout`.
+            resp = await asyncio.wait_for(
+                self._get_client().get(path, params=params), timeout=self.timeout
+            )
+            resp.raise_for_status()
+            return resp.json()
+        except (httpx.ConnectError, httpx.TimeoutException, httpx.HTTPStatusError, asyncio.TimeoutError):
             return None
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,62 @@
+"""Client-side pacing for Gemini calls — requests/min and tokens/min buckets."""
+
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Token buckets for one model's RPM and TPM quotas.
+
+    `wait()` is awaited before each request: it takes one request token and
+    blocks while the token bucket is in debt. Token counts are only known
+    once a stream finishes, so `charge()` debits them afterwards and the
+    *next* request pays for any overdraft. `pause()` stops every caller
+    until a server-provided retry delay has passed. A quota of 0 means
+    unlimited: that bucket is never waited on.
+    """
+
+    def __init__(self, rpm: int, tpm: int, period: float = 60.0):
+        if rpm < 0 or tpm < 0:
+            raise ValueError(
+                f"rate limits must be >= 0 (0 = unlimited), got rpm={rpm} tpm={tpm}"
+            )
+        if period <= 0:
+            raise ValueError(f"period must be > 0, got {period}")
+        self.rpm = rpm
+        self.tpm = tpm
+        self.period = period
+        now = time.monotonic()
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = now
+        self._paused_until = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / self.period)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / self.period)
+
+    async def wait(self):
+        """Block until a request may be sent, then consume one request slot."""
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            delay = self._paused_until - now
+            if self.rpm and self._requests < 1:
+                delay = max(delay, (1 - self._requests) * self.period / self.rpm)
+            if self.tpm and self._tokens < 0:
+                delay = max(delay, -self._tokens * self.period / self.tpm)
+            if delay <= 0:
+                self._requests -= 1
+                return
+            await asyncio.sleep(delay)
+
+    def charge(self, tokens: int):
+        """Debit tokens reported by a finished call (may go negative)."""
+        self._refill(time.monotonic())
+        self._tokens -= tokens
+
+    def pause(self, seconds: float):
+        """Hold all callers for `seconds` (e.g. after a 429 with a retry delay)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
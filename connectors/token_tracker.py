@@ -30,13 +30,19 @@ class TokenTracker:
     def record(self, model: str, session_type: str,
                prompt_tokens: int, completion_tokens: int,
                total_tokens: int):
+        self.record_many([(datetime.now().isoformat(), model, session_type,
+                           prompt_tokens, completion_tokens, total_tokens)])
+
+    def record_many(self, rows: list[tuple]):
+        """Insert (timestamp, model, session_type, prompt, completion, total) rows in one commit."""
+        if not rows:
+            return
         conn = sqlite3.connect(self.db_path)
-        conn.execute(
+        conn.executemany(
             """INSERT INTO token_usage
                (timestamp, model, session_type, prompt_tokens, completion_tokens, total_tokens)
                VALUES (?, ?, ?, ?, ?, ?)""",
-            (datetime.now().isoformat(), model, session_type,
-             prompt_tokens, completion_tokens, total_tokens),
+            rows,
         )
         conn.commit()
         conn.close()
@@ -828,6 +828,20 @@ async def main():
             return category, f"Fetch {nice}"
         return category, tool_name
 
+    def _nth_newline(text: str, n: int) -> int:
+        """Offset of the n-th newline in text (caller ensures it exists)."""
+        pos = -1
+        for _ in range(n):
+            pos = text.find("\n", pos + 1)
+        return pos
+
+    def _nth_newline_from_end(text: str, n: int) -> int:
+        """Offset of the n-th newline counting back from the end of text."""
+        pos = len(text)
+        for _ in range(n):
+            pos = text.rfind("\n", 0, pos)
+        return pos
+
     def _summarize_tool_result(tool_name: str, data: dict) -> str:
         if "error" in data:
             return f"Error: {data['error']}"
@@ -835,9 +849,10 @@ async def main():
             code = data.get("exit_code", -1)
             out = data.get("stdout", "").strip()
             err = data.get("stderr", "").strip()
-            lines = out.split("\n") if out else []
-            if len(lines) > 15:
-                preview = "\n".join(lines[:8] + ["  ..."] + lines[-4:])
+            if out.count("\n") >= 15:
+                head_end = _nth_newline(out, 8)
+                tail_start = _nth_newline_from_end(out, 4)
+                preview = f"{out[:head_end]}\n  ...\n{out[tail_start + 1:]}"
             else:
                 preview = out
             result = f"exit {code}"
@@ -849,10 +864,9 @@ async def main():
         if tool_name == "read_file":
             line_count = data.get("lines", 0)
             content = data.get("content", "")
-            content_lines = content.split("\n")
-            if len(content_lines) > 8:
+            if content.count("\n") >= 8:
                 preview = (
-                    "\n".join(content_lines[:8]) + f"\n  ... ({line_count} lines total)"
+                    content[:_nth_newline(content, 8)] + f"\n  ... ({line_count} lines total)"
                 )
             elif content:
                 preview = content[:500]
@@ -871,14 +885,13 @@ async def main():
                 return "\n".join(files)
             return "\n".join(files[:15] + [f"  ... +{len(files) - 15} more"])
         if tool_name == "search_files":
-            results = data.get("results", "")
-            lines = results.strip().split("\n") if results.strip() else []
-            count = len(lines)
+            results = data.get("results", "").strip()
+            count = results.count("\n") + 1 if results else 0
             if count == 0:
                 return "No matches"
             if count <= 12:
-                return f"{count} matches\n{results.strip()}"
-            preview = "\n".join(lines[:10] + [f"  ... +{count - 10} more"])
+                return f"{count} matches\n{results}"
+            preview = results[:_nth_newline(results, 10)] + f"\n  ... +{count - 10} more"
             return f"{count} matches\n{preview}"
         return str(data)[:300]
 
@@ -933,7 +946,22 @@ async def main():
                     panel=target_panel,
                 )
                 console.print(f"  [bold yellow]APPROVAL NEEDED:[/] {cmd}")
+            elif event == "batch_start":
+                # Parallel tool group (tool_name is a list): one row per call now,
+                # so the panel shows activity while the slowest call runs
+                for name, args in zip(tool_name, data):
+                    on_tool_activity("start", name, args)
+            elif event == "batch_result":
+                # Results arrive together below the group; label each with its call
+                for name, (args, result) in zip(tool_name, data):
+                    _, description = _format_tool_start(name, args)
+                    label = description.partition("\n")[0]
+                    summary = _summarize_tool_result(name, result)
+                    metal.send_chat_message(
+                        "tool_result", f"{label}: {summary}", panel=target_panel
+                    )
 
+        on_tool_activity.handles_batches = True
         return on_tool_activity
 
     def broadcast_status():
@@ -956,6 +984,7 @@ async def main():
             if panel_count > 0 and panel_count < 5:
                 new_panel = panel_count
                 panel_count += 1
+                new_rid = router.open_panel()
                 active_panel = new_panel
                 metal.send_chat_split(_panel_name(new_panel))
                 metal.send({"type": "chat_focus", "panel": new_panel})
@@ -972,7 +1001,7 @@ async def main():
 
                     on_tool_activity = make_tool_activity_cb(target_panel)
                     await router.start_code_session_idle(
-                        arguments, user_text, panel=target_panel
+                        arguments, user_text, panel=new_rid
                     )
                     metal.send_chat_message(
                         "gemini",
@@ -1007,7 +1036,7 @@ async def main():
 
             if tool_name == "code_assistant":
                 await router.start_code_session_idle(
-                    arguments, user_text, panel=target_panel
+                    arguments, user_text, panel=router.panel_id(target_panel)
                 )
                 if user_text and user_text != "__hotkey__":
                     # Voice-triggered with a request — send immediately
@@ -1016,13 +1045,14 @@ async def main():
 
                     async def run_code_initial(
                         _p=target_panel,
+                        _rid=router.panel_id(target_panel),
                         _chunk=on_chunk,
                         _ta=on_tool_activity,
                         _text=user_text,
                     ):
                         try:
                             result = await router.send_code_initial(
-                                _text, panel=_p, on_chunk=_chunk, on_tool_activity=_ta
+                                _text, panel=_rid, on_chunk=_chunk, on_tool_activity=_ta
                             )
                             if not result or not result.strip():
                                 metal.send_chat_message(
@@ -1050,14 +1080,17 @@ async def main():
             else:
 
                 async def run_initial(
-                    _p=target_panel, _chunk=on_chunk, _ta=on_tool_activity
+                    _p=target_panel,
+                    _rid=router.panel_id(target_panel),
+                    _chunk=on_chunk,
+                    _ta=on_tool_activity,
                 ):
                     try:
                         await router.start_skill_session(
                             tool_name,
                             arguments,
                             user_text,
-                            panel=_p,
+                            panel=_rid,
                             on_chunk=_chunk,
                             on_tool_activity=_ta,
                         )
@@ -1069,10 +1102,13 @@ async def main():
                 skill_tasks[target_panel] = asyncio.create_task(run_initial())
 
         elif event_type == "__skill_chat__":
+            # `panel` is the UI's dense index; the router keys sessions by stable id
+            rid = router.panel_id(panel)
+
             # Escape key: cancel stream + close focused panel
             if user_text == "__escape__":
                 # Cancel the focused panel's task and session
-                router.cancel_panel(panel)
+                router.cancel_panel(rid)
                 task = skill_tasks.pop(panel, None)
                 if task and not task.done():
                     task.cancel()
@@ -1083,7 +1119,7 @@ async def main():
                     console.print(f"[yellow]Stream cancelled (panel {panel})[/]")
 
                 if panel_count > 1:
-                    router.close_panel(panel)
+                    router.close_panel(rid)
                     panel_count -= 1
                     metal.send_chat_close_panel()
                     # Renumber: shift tasks for panels above the closed one
@@ -1101,7 +1137,7 @@ async def main():
                     skill_active = False
                     pending_tool_name = None
                     skill_tasks.clear()
-                    router.close_session()
+                    await router.close_session()
                     metal.send_chat_end()
                     await presence.update_activity("online")
                     console.print("[green]All windows closed. Shutting down.[/]")
@@ -1112,6 +1148,7 @@ async def main():
                 if panel_count < 5:
                     new_panel = panel_count
                     panel_count += 1
+                    new_rid = router.open_panel()
                     active_panel = new_panel
                     metal.send_chat_split(_panel_name(new_panel))
                     metal.send({"type": "chat_focus", "panel": new_panel})
@@ -1121,7 +1158,9 @@ async def main():
 
                     # Auto-create code session for new panel
                     if pending_tool_name == "code_assistant":
-                        await router.start_code_session_idle("{}", "", panel=new_panel)
+                        await router.start_code_session_idle(
+                            "{}", "", panel=new_rid
+                        )
                         metal.send_chat_message(
                             "gemini",
                             "**Opus 4.6 Assistant 1 ready.** Type or speak your request.",
@@ -1287,11 +1326,11 @@ async def main():
             if _is_close_command(user_text):
                 if panel_count > 1:
                     # Cancel and close focused panel
-                    router.cancel_panel(panel)
+                    router.cancel_panel(rid)
                     task = skill_tasks.pop(panel, None)
                     if task and not task.done():
                         task.cancel()
-                    router.close_panel(panel)
+                    router.close_panel(rid)
                     panel_count -= 1
                     metal.send_chat_close_panel()
                     # Renumber tasks
@@ -1321,14 +1360,14 @@ async def main():
                 skill_active = False
                 pending_tool_name = None
                 skill_tasks.clear()
-                router.close_session()
+                await router.close_session()
                 metal.send_chat_end()
                 metal.send_state("listening")
                 console.print("[green]Jarvis resumed.[/]")
                 return
 
             # ── Gate: command approval pending on this panel — resolve yes/no ──
-            if router.has_pending_approval(panel):
+            if router.has_pending_approval(rid):
                 normalized = user_text.lower().strip().rstrip(".")
                 approve_phrases = (
                     "yes",
@@ -1345,14 +1384,14 @@ async def main():
                     "",
                 )
                 if normalized in approve_phrases or user_text == "\n" or not user_text:
-                    cmd = router.get_pending_command(panel)
-                    router.approve_command(True, panel=panel)
+                    cmd = router.get_pending_command(rid)
+                    router.approve_command(True, panel=rid)
                     metal.send_chat_message("tool_result", "Approved", panel=panel)
                     console.print(
                         f"  [green]Command approved (panel {panel}):[/] {cmd}"
                     )
                 else:
-                    router.approve_command(False, panel=panel)
+                    router.approve_command(False, panel=rid)
                     metal.send_chat_message("tool_result", "Denied", panel=panel)
                     console.print(f"  [red]Command denied (panel {panel})[/]")
                 return
@@ -1387,12 +1426,16 @@ async def main():
             _on_tool_activity = make_tool_activity_cb(target_panel)
 
             async def run_followup(
-                _p=target_panel, _chunk=on_chunk, _ta=_on_tool_activity, _text=user_text
+                _p=target_panel,
+                _rid=rid,
+                _chunk=on_chunk,
+                _ta=_on_tool_activity,
+                _text=user_text,
             ):
                 try:
                     result = await router.send_followup(
                         _text,
-                        panel=_p,
+                        panel=_rid,
                         on_chunk=_chunk,
                         on_tool_activity=_ta,
                     )
@@ -1741,7 +1784,7 @@ async def main():
                 active_panel, \
                 _last_interaction, \
                 _current_game
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             try:
                 while metal.proc and metal.proc.poll() is None:
                     line = await loop.run_in_executor(None, metal.proc.stdout.readline)
@@ -1891,6 +1934,7 @@ async def main():
         traceback.print_exc()
     finally:
         console.print("\n[dim]Shutting down...[/]")
+        await router.drain_usage()
         await presence.disconnect()
         mic.stop()
         whisper_server.stop()
@@ -8,7 +8,7 @@ import websockets
 
 SERVER_URL = "ws://localhost:8790"
 
-BOT_NAMES = {"Alex", "Sam", "Jordan"}
+BOT_NAMES = frozenset({"Alex", "Sam", "Jordan"})
 
 BOTS = [
     {"name": "Alex", "game": "KartBros", "delay": 2},
@@ -18,6 +18,9 @@ BOTS = [
 
 
 async def run_bot(name: str, game: str, delay: float):
+    # Locals for the per-message loop below
+    bot_names = BOT_NAMES
+    loads = json.loads
     user_id = str(uuid.uuid4())
     async with websockets.connect(SERVER_URL) as ws:
         await ws.send(json.dumps({
@@ -26,21 +29,21 @@ async def run_bot(name: str, game: str, delay: float):
             "display_name": name,
             "version": "1",
         }))
-        welcome = json.loads(await ws.recv())
+        welcome = loads(await ws.recv())
         print(f"[{name}] Connected. Waiting for real user...")
 
         # Wait until we see a non-bot user come online
         real_user_seen = False
         # Check welcome list for non-bot users
         for u in welcome.get("users", []):
-            if u.get("display_name") not in BOT_NAMES:
+            if u.get("display_name") not in bot_names:
                 real_user_seen = True
                 break
 
         while not real_user_seen:
             raw = await ws.recv()
-            msg = json.loads(raw)
-            if msg.get("type") == "user_online" and msg.get("display_name") not in BOT_NAMES:
+            msg = loads(raw)
+            if msg.get("type") == "user_online" and msg.get("display_name") not in bot_names:
                 real_user_seen = True
 
         print(f"[{name}] Real user detected! Starting {game} in {delay}s...")
@@ -1,27 +1,42 @@
-import json
+import os
 import socket
 import uuid
 from pathlib import Path
 
+import orjson
+
 IDENTITY_PATH = Path.home() / ".jarvis" / "identity.json"
 
+_IDENTITY_CACHE: dict | None = None
+
+
+def _write_identity(data: dict):
+    """Write identity.json atomically (temp file + rename)."""
+    IDENTITY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = IDENTITY_PATH.with_suffix(".tmp")
+    tmp.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    os.replace(tmp, IDENTITY_PATH)
+
 
 def load_identity() -> dict:
-    """Load or create a persistent Jarvis identity for this machine."""
-    if IDENTITY_PATH.exists():
-        data = json.loads(IDENTITY_PATH.read_text())
-        if "user_id" in data and "display_name" in data:
-            if "name_set" not in data:
-                data["name_set"] = False
-            return data
+    """Load or create a persistent Jarvis identity for this machine.
+
+    Missing fields are filled from fresh defaults and written back, so an
+    absent, partial, or legacy (pre-``name_set``) file all take one path.
+    """
+    global _IDENTITY_CACHE
+    if _IDENTITY_CACHE is not None:
+        return _IDENTITY_CACHE
 
+    data = orjson.loads(IDENTITY_PATH.read_bytes()) if IDENTITY_PATH.exists() else {}
     identity = {
         "user_id": str(uuid.uuid4()),
         "display_name": socket.gethostname(),
         "name_set": False,
-    }
-    IDENTITY_PATH.parent.mkdir(parents=True, exist_ok=True)
-    IDENTITY_PATH.write_text(json.dumps(identity, indent=2))
+    } | data
+    if identity != data:
+        _write_identity(identity)
+    _IDENTITY_CACHE = identity
     return identity
 
 
@@ -30,5 +45,5 @@ def save_display_name(name: str) -> dict:
     data = load_identity()
     data["display_name"] = name
     data["name_set"] = True
-    IDENTITY_PATH.write_text(json.dumps(data, indent=2))
+    _write_identity(data)
     return data
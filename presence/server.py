@@ -8,8 +8,8 @@ import json
 import logging
 import os
 import time
-from dataclasses import dataclass, field
 
+import msgspec
 import websockets
 
 log = logging.getLogger("presence.server")
@@ -18,201 +18,338 @@ HEARTBEAT_TIMEOUT = 90   # seconds without heartbeat → evict
 OFFLINE_GRACE = 10       # seconds before broadcasting offline (allows reconnect)
 PORT = 8790
 
+# Heartbeat bookkeeping uses the monotonic clock (immune to wall-clock
+# jumps); outgoing "ts" fields are stamped with wall-clock epoch seconds.
 
-@dataclass
-class UserPresence:
+
+class UserPresence(msgspec.Struct):
     user_id: str
     display_name: str
     status: str = "online"
     activity: str | None = None
     connected_at: float = 0.0
     last_heartbeat: float = 0.0
-    metadata: dict = field(default_factory=dict)
+    metadata: dict = msgspec.field(default_factory=dict)
+    ws: object | None = None  # live connection; None while in offline grace
+
+
+# ── Outbound frames (encoded straight from struct fields, no dicts) ──
+
+
+class OnlineUser(msgspec.Struct):
+    user_id: str
+    display_name: str
+    status: str
+    activity: str | None
+
+
+class Welcome(msgspec.Struct, tag_field="type", tag="welcome"):
+    your_id: str
+    users: msgspec.Raw  # pre-encoded JSON array of OnlineUser entries
+
+
+class UserOnline(msgspec.Struct, tag_field="type", tag="user_online"):
+    user_id: str
+    display_name: str
+    ts: float
+
+
+class UserOffline(msgspec.Struct, tag_field="type", tag="user_offline"):
+    user_id: str
+    display_name: str
+    ts: float
+
+
+class Pong(msgspec.Struct, tag_field="type", tag="pong"):
+    online_count: int
+
+
+class ActivityChanged(msgspec.Struct, tag_field="type", tag="activity_changed"):
+    user_id: str
+    display_name: str
+    status: str
+    activity: str | None
+    ts: float
+
+
+# ── Inbound frames (decoded and dispatched on the "type" tag) ──
+# Fields a client may send as null are declared `| None`; the handler
+# substitutes the default, as the dict-based parser's .get() did.
+
+
+class Connect(msgspec.Struct, tag_field="type", tag="connect"):
+    user_id: str | None = None
+    display_name: str | None = "Unknown"
+    version: str | None = "1"
+
+
+class Ping(msgspec.Struct, tag_field="type", tag="ping"):
+    pass
+
+
+class ActivityUpdate(msgspec.Struct, tag_field="type", tag="activity_update"):
+    status: str | None = "online"
+    activity: str | None = None
+    metadata: dict | None = None
+
+
+class GameInvite(msgspec.Struct, tag_field="type", tag="game_invite"):
+    game: str | None = ""
+    code: str | None = ""
+
+
+class Poke(msgspec.Struct, tag_field="type", tag="poke"):
+    target_user_id: str | None = None
+
+
+class Disconnect(msgspec.Struct, tag_field="type", tag="disconnect"):
+    pass
+
+
+class _Envelope(msgspec.Struct):
+    type: str | None = None
+
+
+_INBOUND = (Connect, Ping, ActivityUpdate, GameInvite, Poke, Disconnect)
+_INBOUND_TAGS = frozenset(cls.__struct_config__.tag for cls in _INBOUND)
+
+_ENCODER = msgspec.json.Encoder()
+_DECODER = msgspec.json.Decoder(Connect | Ping | ActivityUpdate | GameInvite | Poke | Disconnect)
+# Re-reads only the "type" of a frame that failed validation
+_ENVELOPE_DECODER = msgspec.json.Decoder(_Envelope)
+
+# Frames go out as text (str); msgspec's bytes are decoded before sending.
+_ERR_INVALID_JSON = '{"type":"error","message":"Invalid JSON"}'
+_ERR_MISSING_USER_ID = '{"type":"error","message":"Missing user_id"}'
 
 
 class PresenceServer:
     def __init__(self):
         self.users: dict[str, UserPresence] = {}
-        self.sockets: dict[str, websockets.WebSocketServerProtocol] = {}
-        self.grace_tasks: dict[str, asyncio.Task] = {}
+        # Pending offline broadcasts; a timer handle is far cheaper than a
+        # sleeping Task and cancelling it raises nothing.
+        self.grace_timers: dict[str, asyncio.TimerHandle] = {}
+        # Encoded OnlineUser entry per user, refreshed only when that user
+        # changes so a welcome frame never re-encodes the whole roster.
+        self._user_entries: dict[str, bytes] = {}
+        # Users with a live socket, rebuilt lazily after a connect/disconnect
+        # so broadcasts don't copy the user table on every send.
+        self._conn_snapshot: tuple[UserPresence, ...] = ()
+        self._conn_dirty = False
+
+    def _connected(self) -> tuple[UserPresence, ...]:
+        if self._conn_dirty:
+            self._conn_snapshot = tuple(u for u in self.users.values() if u.ws is not None)
+            self._conn_dirty = False
+        return self._conn_snapshot
+
+    def _refresh_entry(self, u: UserPresence):
+        self._user_entries[u.user_id] = _ENCODER.encode(
+            OnlineUser(u.user_id, u.display_name, u.status, u.activity)
+        )
+
+    def _users_payload(self, exclude: str) -> msgspec.Raw:
+        """JSON array of every cached user entry except `exclude`."""
+        return msgspec.Raw(b"[" + b",".join(
+            raw for uid, raw in self._user_entries.items() if uid != exclude
+        ) + b"]")
 
     async def handler(self, ws):
         user_id = None
         try:
             async for raw in ws:
+                now = time.monotonic()
                 try:
-                    msg = json.loads(raw)
-                except json.JSONDecodeError:
-                    await ws.send(json.dumps({"type": "error", "message": "Invalid JSON"}))
+                    msg = _DECODER.decode(raw)
+                except msgspec.ValidationError as e:
+                    try:
+                        msg_type = _ENVELOPE_DECODER.decode(raw).type
+                    except msgspec.ValidationError:
+                        msg_type = None
+                    if msg_type not in _INBOUND_TAGS:
+                        continue  # Unknown or missing type (e.g. a newer client) — ignored
+                    await ws.send(_ENCODER.encode({"type": "error", "message": str(e)}).decode())
+                    continue
+                except msgspec.DecodeError:
+                    await ws.send(_ERR_INVALID_JSON)
                     continue
 
-                msg_type = msg.get("type")
-
-                if msg_type == "connect":
-                    user_id = msg.get("user_id")
-                    if not user_id:
-                        await ws.send(json.dumps({"type": "error", "message": "Missing user_id"}))
-                        continue
-
-                    # Cancel any pending offline grace period
-                    grace = self.grace_tasks.pop(user_id, None)
-                    if grace:
-                        grace.cancel()
-
-                    is_new = user_id not in self.users
-                    now = time.time()
-                    self.users[user_id] = UserPresence(
-                        user_id=user_id,
-                        display_name=msg.get("display_name", "Unknown"),
-                        connected_at=now,
-                        last_heartbeat=now,
-                    )
-                    self.sockets[user_id] = ws
-
-                    # Send welcome with current user list
-                    await ws.send(json.dumps({
-                        "type": "welcome",
-                        "your_id": user_id,
-                        "users": [
-                            {"user_id": u.user_id, "display_name": u.display_name,
-                             "status": u.status, "activity": u.activity}
-                            for u in self.users.values() if u.user_id != user_id
-                        ],
-                    }))
-
-                    if is_new:
-                        log.info("User connected: %s (%s)", self.users[user_id].display_name, user_id[:8])
-                        await self.broadcast({
-                            "type": "user_online",
-                            "user_id": user_id,
-                            "display_name": self.users[user_id].display_name,
-                            "ts": now,
-                        }, exclude=user_id)
-
-                elif msg_type == "ping":
-                    if user_id and user_id in self.users:
-                        self.users[user_id].last_heartbeat = time.time()
-                    await ws.send(json.dumps({
-                        "type": "pong",
-                        "online_count": len(self.users),
-                    }))
-
-                elif msg_type == "activity_update":
-                    if user_id and user_id in self.users:
-                        u = self.users[user_id]
-                        u.status = msg.get("status", "online")
-                        u.activity = msg.get("activity")
-                        u.metadata = msg.get("metadata", {})
-                        u.last_heartbeat = time.time()
-                        log.info("Activity: %s → %s %s", u.display_name, u.status, u.activity or "")
-                        await self.broadcast({
-                            "type": "activity_changed",
-                            "user_id": user_id,
-                            "display_name": u.display_name,
-                            "status": u.status,
-                            "activity": u.activity,
-                            "ts": time.time(),
-                        }, exclude=user_id)
-
-                elif msg_type == "game_invite":
-                    if user_id and user_id in self.users:
-                        u = self.users[user_id]
-                        log.info("Invite: %s hosting %s code=%s", u.display_name, msg.get("game"), msg.get("code"))
-                        invite_msg = {
-                            "type": "game_invite",
-                            "user_id": user_id,
-                            "display_name": u.display_name,
-                            "game": msg.get("game", ""),
-                            "code": msg.get("code", ""),
-                            "ts": time.time(),
-                        }
-                        await self.broadcast(invite_msg, exclude=user_id)
-                        # Send confirmation back to the sender
-                        online_names = [
-                            other.display_name for other in self.users.values()
-                            if other.user_id != user_id
-                        ]
-                        await ws.send(json.dumps({
-                            "type": "invite_sent",
-                            "game": invite_msg["game"],
-                            "code": invite_msg["code"],
-                            "sent_to": online_names,
-                        }))
-
-                elif msg_type == "poke":
-                    if user_id and user_id in self.users:
-                        target_id = msg.get("target_user_id")
-                        if target_id and target_id in self.sockets:
+                match msg:
+                    case Connect():
+                        if not msg.user_id:
+                            await ws.send(_ERR_MISSING_USER_ID)
+                            continue
+                        user_id = msg.user_id
+
+                        # Cancel any pending offline grace period
+                        grace = self.grace_timers.pop(user_id, None)
+                        if grace:
+                            grace.cancel()
+
+                        is_new = user_id not in self.users
+                        self.users[user_id] = UserPresence(
+                            user_id=user_id,
+                            display_name="Unknown" if msg.display_name is None else msg.display_name,
+                            connected_at=now,
+                            last_heartbeat=now,
+                            ws=ws,
+                        )
+                        self._conn_dirty = True
+                        self._refresh_entry(self.users[user_id])
+
+                        # Send welcome with current user list
+                        await ws.send(_ENCODER.encode(Welcome(
+                            your_id=user_id,
+                            users=self._users_payload(exclude=user_id),
+                        )).decode())
+
+                        if is_new:
+                            log.info("User connected: %s (%s)", self.users[user_id].display_name, user_id[:8])
+                            self.broadcast(UserOnline(
+                                user_id=user_id,
+                                display_name=self.users[user_id].display_name,
+                                ts=time.time(),
+                            ), exclude=user_id)
+
+                    case Ping():
+                        if user_id and user_id in self.users:
+                            self.users[user_id].last_heartbeat = now
+                        await ws.send(_ENCODER.encode(Pong(online_count=len(self.users))).decode())
+
+                    case ActivityUpdate():
+                        if user_id and user_id in self.users:
                             u = self.users[user_id]
-                            log.info("Poke: %s → %s", u.display_name, target_id[:8])
-                            try:
-                                await self.sockets[target_id].send(json.dumps({
-                                    "type": "poke",
-                                    "user_id": user_id,
-                                    "display_name": u.display_name,
-                                    "ts": time.time(),
-                                }))
-                            except websockets.ConnectionClosed:
-                                pass
-
-                elif msg_type == "disconnect":
-                    break
+                            u.status = "online" if msg.status is None else msg.status
+                            u.activity = msg.activity
+                            u.metadata = msg.metadata or {}
+                            u.last_heartbeat = now
+                            self._refresh_entry(u)
+                            log.info("Activity: %s → %s %s", u.display_name, u.status, u.activity or "")
+                            self.broadcast_raw(_ENCODER.encode(ActivityChanged(
+                                user_id=user_id,
+                                display_name=u.display_name,
+                                status=u.status,
+                                activity=u.activity,
+                                ts=time.time(),
+                            )), exclude=user_id)
+
+                    case GameInvite():
+                        if user_id and user_id in self.users:
+                            u = self.users[user_id]
+                            log.info("Invite: %s hosting %s code=%s", u.display_name, msg.game, msg.code)
+                            invite_msg = {
+                                "type": "game_invite",
+                                "user_id": user_id,
+                                "display_name": u.display_name,
+                                "game": msg.game,
+                                "code": msg.code,
+                                "ts": time.time(),
+                            }
+                            self.broadcast(invite_msg, exclude=user_id)
+                            # Send confirmation back to the sender
+                            online_names = [
+                                other.display_name for other in self.users.values()
+                                if other.user_id != user_id
+                            ]
+                            await ws.send(json.dumps({
+                                "type": "invite_sent",
+                                "game": msg.game,
+                                "code": msg.code,
+                                "sent_to": online_names,
+                            }))
+
+                    case Poke():
+                        if user_id and user_id in self.users:
+                            target_id = msg.target_user_id
+                            target = self.users.get(target_id) if target_id else None
+                            if target is not None and target.ws is not None:
+                                u = self.users[user_id]
+                                log.info("Poke: %s → %s", u.display_name, target_id[:8])
+                                try:
+                                    await target.ws.send(json.dumps({
+                                        "type": "poke",
+                                        "user_id": user_id,
+                                        "display_name": u.display_name,
+                                        "ts": time.time(),
+                                    }))
+                                except websockets.ConnectionClosed:
+                                    pass
+
+                    case Disconnect():
+                        break
 
         except websockets.ConnectionClosed:
             pass
         finally:
-            if user_id:
-                self.sockets.pop(user_id, None)
-                self.grace_tasks[user_id] = asyncio.create_task(
-                    self._offline_grace(user_id)
-                )
-
-    async def _offline_grace(self, user_id: str):
-        """Wait before broadcasting offline to allow quick reconnects."""
-        await asyncio.sleep(OFFLINE_GRACE)
+            # Only start the grace period if this handler still owns the
+            # user's connection (not replaced by a reconnect or reaped).
+            u = self.users.get(user_id) if user_id else None
+            if u is not None and u.ws is ws:
+                u.ws = None
+                self._conn_dirty = True
+                self._start_grace(user_id)
+
+    def _start_grace(self, user_id: str):
+        """Schedule the offline broadcast, allowing a quick reconnect first."""
+        self.grace_timers[user_id] = asyncio.get_running_loop().call_later(
+            OFFLINE_GRACE, self._go_offline, user_id
+        )
+
+    def _go_offline(self, user_id: str):
         user = self.users.pop(user_id, None)
-        self.grace_tasks.pop(user_id, None)
+        self._user_entries.pop(user_id, None)
+        self.grace_timers.pop(user_id, None)
         if user:
             log.info("User offline: %s (%s)", user.display_name, user_id[:8])
-            await self.broadcast({
-                "type": "user_offline",
-                "user_id": user_id,
-                "display_name": user.display_name,
-                "ts": time.time(),
-            })
-
-    async def broadcast(self, msg: dict, exclude: str = None):
-        raw = json.dumps(msg)
-        for uid, ws in list(self.sockets.items()):
-            if uid != exclude:
-                try:
-                    await ws.send(raw)
-                except websockets.ConnectionClosed:
-                    pass
+            self.broadcast(UserOffline(
+                user_id=user_id,
+                display_name=user.display_name,
+                ts=time.time(),
+            ))
+
+    def broadcast(self, msg: dict | msgspec.Struct, exclude: str = None):
+        self.broadcast_raw(_ENCODER.encode(msg), exclude=exclude)
+
+    def broadcast_raw(self, raw: bytes, exclude: str = None):
+        """Write a pre-encoded frame to every live socket but `exclude`.
+
+        websockets.broadcast() frames the message once and writes it to each
+        transport synchronously; closed connections are skipped. Sent as a
+        text frame, like every other frame.
+        """
+        websockets.broadcast(
+            [u.ws for u in self._connected() if u.ws is not None and u.user_id != exclude],
+            raw.decode(),
+        )
 
     async def reaper(self):
         """Periodically evict users with stale heartbeats."""
         while True:
             await asyncio.sleep(30)
-            now = time.time()
-            for uid, user in list(self.users.items()):
-                if uid in self.sockets and now - user.last_heartbeat > HEARTBEAT_TIMEOUT:
+            now = time.monotonic()
+            for user in self._connected():
+                if user.ws is not None and now - user.last_heartbeat > HEARTBEAT_TIMEOUT:
                     log.info("Reaping stale connection: %s", user.display_name)
-                    ws = self.sockets.pop(uid, None)
-                    if ws:
-                        try:
-                            await ws.close()
-                        except Exception:
-                            pass
-                    self.grace_tasks[uid] = asyncio.create_task(
-                        self._offline_grace(uid)
-                    )
+                    ws, user.ws = user.ws, None
+                    self._conn_dirty = True
+                    try:
+                        await ws.close()
+                    except Exception:
+                        pass
+                    self._start_grace(user.user_id)
 
     async def run(self, host="0.0.0.0", port=PORT):
-        asyncio.create_task(self.reaper())
         log.info("Presence server starting on %s:%d", host, port)
-        async with websockets.serve(self.handler, host, port):
-            await asyncio.Future()  # run forever
+        reaper = asyncio.create_task(self.reaper())
+        try:
+            async with websockets.serve(self.handler, host, port):
+                await asyncio.Future()  # run forever
+        finally:
+            # Stop the reaper and drop any offline broadcasts still pending
+            reaper.cancel()
+            for timer in self.grace_timers.values():
+                timer.cancel()
+            self.grace_timers.clear()
 
 
 def main():
@@ -10,12 +10,24 @@ so you can see notifications appear in your real Jarvis overlay.
 import asyncio
 import json
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
+import orjson
 import websockets
 
 SERVER_URL = "ws://localhost:8790"
 FAKE_USER = {"user_id": str(uuid.uuid4()), "display_name": "TestUser"}
 
+# Pong frames arrive every heartbeat; match their encoded prefix instead of parsing
+_PONG_PREFIX = '{"type":"pong"'
+
+# Dedicated thread for blocking input() so the loop's default executor stays free
+_STDIN_EXEC = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stdin")
+
+
+def _read_command() -> str:
+    return input("> ").strip().lower()
+
 
 async def main():
     print(f"Connecting to {SERVER_URL} as '{FAKE_USER['display_name']}'...")
@@ -46,7 +58,9 @@ async def main():
         async def listen():
             try:
                 async for raw in ws:
-                    msg = json.loads(raw)
+                    if raw.startswith(_PONG_PREFIX):
+                        continue
+                    msg = orjson.loads(raw)
                     if msg["type"] == "pong":
                         continue
                     print(f"  << {msg['type']}: {json.dumps(msg)}")
@@ -67,9 +81,9 @@ async def main():
         hb = asyncio.create_task(heartbeat())
 
         # Interactive command loop
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         while True:
-            cmd = await loop.run_in_executor(None, lambda: input("> ").strip().lower())
+            cmd = await loop.run_in_executor(_STDIN_EXEC, _read_command)
             if cmd == "quit":
                 await ws.send(json.dumps({"type": "disconnect"}))
                 print("Disconnected.")
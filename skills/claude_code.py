@@ -3,6 +3,7 @@
 import asyncio
 import logging
 import os
+import sys
 import time
 
 from claude_code_sdk import (
@@ -21,7 +22,7 @@ from claude_code_sdk.types import StreamEvent
 import config
 
 _log = logging.getLogger("jarvis.claude_code")
-_log.setLevel(logging.DEBUG)
+_log.setLevel(os.environ.get("JARVIS_CC_LOG_LEVEL", "DEBUG").upper())
 _fh = logging.FileHandler(os.path.join(os.path.dirname(os.path.dirname(__file__)), "jarvis_claude_code.log"))
 _fh.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", datefmt="%H:%M:%S"))
 _log.addHandler(_fh)
@@ -32,6 +33,26 @@ _MSG_TIMEOUT = 120.0          # Max wait between messages (idle timeout)
 _TURN_TIMEOUT = 600.0         # Max wall-clock time for entire run() call
 _HEARTBEAT_INTERVAL = 30.0    # Log a heartbeat if waiting this long for a message
 
+# Streamed text is coalesced before reaching on_chunk
+_FLUSH_CHARS = 512            # Flush once this many chars are buffered
+_FLUSH_DELAY = 0.03           # ...or this long after the first buffered delta
+
+# Subagent-internal tool starts only drive a live progress row, so they are
+# forwarded at most this often (the final op count is always exact). Their
+# results are always forwarded: each one carries its own error status.
+_SUBAGENT_EMIT_INTERVAL = 0.2
+
+# Subprocess env overrides, built once (config has already loaded .env).
+# Strip nesting protection vars and API key so OAuth token is used.
+_SESSION_ENV = {
+    "CLAUDECODE": "",
+    "CLAUDE_CODE_ENTRYPOINT": "",
+    "ANTHROPIC_API_KEY": "",  # Clear so OAuth token takes precedence
+}
+_OAUTH_TOKEN = os.environ.get("CLAUDE_CODE_OAUTH_TOKEN")
+if _OAUTH_TOKEN:  # Pass through OAuth token
+    _SESSION_ENV["CLAUDE_CODE_OAUTH_TOKEN"] = _OAUTH_TOKEN
+
 # Claude Code tool → Jarvis activity category
 _TOOL_CATEGORIES = {
     "Read": "read", "Edit": "edit", "Write": "write",
@@ -51,41 +72,58 @@ JARVIS_SYSTEM_PROMPT = (
 )
 
 
+_PROJECTS_PREFIX = str(config.PROJECTS_DIR) + "/"
+_PREFIX_LEN = len(_PROJECTS_PREFIX)
+
+
+def _short(path: str) -> str:
+    """Strip the projects directory prefix for display."""
+    return path[_PREFIX_LEN:] if path.startswith(_PROJECTS_PREFIX) else path
+
+
+def _fmt_edit(tool_input: dict) -> str:
+    path = _short(tool_input.get("file_path", ""))
+    old = tool_input.get("old_string", "")
+    preview = (old[:50].replace("\n", " ") + "...") if len(old) > 50 else old.replace("\n", " ")
+    return f"Edit {path}\n  find: {preview}"
+
+
+def _fmt_write(tool_input: dict) -> str:
+    path = _short(tool_input.get("file_path", ""))
+    size = len(tool_input.get("content", ""))
+    return f"Write {path} ({size} chars)"
+
+
+def _fmt_grep(tool_input: dict) -> str:
+    pattern = tool_input.get("pattern", "")
+    path = _short(tool_input.get("path", "."))
+    return f"Search /{pattern}/ in {path}"
+
+
+def _fmt_task(tool_input: dict) -> str:
+    desc = tool_input.get("description", tool_input.get("prompt", "")[:60])
+    return f"Subagent: {desc}"
+
+
+# Claude Code tool → description formatter (one dict lookup per tool event)
+_TOOL_FORMATTERS = {
+    "Read": lambda ti: f"Read {_short(ti.get('file_path', ''))}",
+    "Edit": _fmt_edit,
+    "Write": _fmt_write,
+    "Bash": lambda ti: f"$ {ti.get('command', '')}",
+    "Grep": _fmt_grep,
+    "Glob": lambda ti: f"Glob {ti.get('pattern', '*')}",
+    "WebSearch": lambda ti: f"Search: {ti.get('query', '')}",
+    "WebFetch": lambda ti: f"Fetch: {ti.get('url', '')}",
+    "Task": _fmt_task,
+}
+
+
 def _format_tool_start(tool_name: str, tool_input: dict) -> tuple[str, str]:
     """Return (category, human_description) for a Claude Code tool call."""
     category = _TOOL_CATEGORIES.get(tool_name, "tool")
-    prefix = str(config.PROJECTS_DIR) + "/"
-
-    def short(path: str) -> str:
-        return path[len(prefix):] if path.startswith(prefix) else path
-
-    if tool_name == "Read":
-        return category, f"Read {short(tool_input.get('file_path', ''))}"
-    elif tool_name == "Edit":
-        path = short(tool_input.get("file_path", ""))
-        old = tool_input.get("old_string", "")
-        preview = (old[:50].replace("\n", " ") + "...") if len(old) > 50 else old.replace("\n", " ")
-        return category, f"Edit {path}\n  find: {preview}"
-    elif tool_name == "Write":
-        path = short(tool_input.get("file_path", ""))
-        size = len(tool_input.get("content", ""))
-        return category, f"Write {path} ({size} chars)"
-    elif tool_name == "Bash":
-        return category, f"$ {tool_input.get('command', '')}"
-    elif tool_name == "Grep":
-        pattern = tool_input.get("pattern", "")
-        path = short(tool_input.get("path", "."))
-        return category, f"Search /{pattern}/ in {path}"
-    elif tool_name == "Glob":
-        return category, f"Glob {tool_input.get('pattern', '*')}"
-    elif tool_name == "WebSearch":
-        return category, f"Search: {tool_input.get('query', '')}"
-    elif tool_name == "WebFetch":
-        return category, f"Fetch: {tool_input.get('url', '')}"
-    elif tool_name == "Task":
-        desc = tool_input.get("description", tool_input.get("prompt", "")[:60])
-        return category, f"Subagent: {desc}"
-    return category, tool_name
+    fmt = _TOOL_FORMATTERS.get(tool_name)
+    return category, fmt(tool_input) if fmt else tool_name
 
 
 def _format_tool_result(tool_name: str, content) -> str:
@@ -101,44 +139,94 @@ def _format_tool_result(tool_name: str, content) -> str:
             types = [b.get("type", "?") for b in content if isinstance(b, dict)]
             return f"({', '.join(types)} content)" if types else "(no text output)"
     text = str(content)
-    lines = text.split("\n")
-    if len(lines) > 30:
-        return "\n".join(lines[:20] + [f"  ... ({len(lines) - 23} more lines)"] + lines[-3:])
+    newlines = text.count("\n")
+    if newlines >= 30:
+        # Keep the first 20 and last 3 lines, located by newline offsets so
+        # huge outputs are never split into a list of lines.
+        head_end = -1
+        for _ in range(20):
+            head_end = text.find("\n", head_end + 1)
+        tail_start = len(text)
+        for _ in range(3):
+            tail_start = text.rfind("\n", 0, tail_start)
+        return f"{text[:head_end]}\n  ... ({newlines - 22} more lines)\n{text[tail_start + 1:]}"
     if len(text) > 1500:
         return text[:1500] + "..."
     return text
 
 
+class ChunkBuffer:
+    """Coalesces streamed text deltas into fewer on_chunk calls.
+
+    Text is flushed when _FLUSH_CHARS accumulate or _FLUSH_DELAY after the
+    first pending delta, whichever comes first. Callers flush explicitly
+    before anything that must be ordered after the text (tool activity).
+    """
+
+    def __init__(self, on_chunk):
+        self._on_chunk = on_chunk
+        self._pending: list[str] = []
+        self._pending_len = 0
+        self._timer: asyncio.TimerHandle | None = None
+
+    def write(self, text: str):
+        self._pending.append(text)
+        self._pending_len += len(text)
+        if self._pending_len >= _FLUSH_CHARS:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(_FLUSH_DELAY, self.flush)
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            text = "".join(self._pending)
+            self._pending.clear()
+            self._pending_len = 0
+            self._on_chunk(text)
+
+
 class ClaudeCodeSession:
     """Manages a Claude Code Agent SDK session for a single Jarvis panel."""
 
+    # Receive-loop state is read/written per message; slots keep those
+    # accesses off the instance dict.
+    __slots__ = (
+        "model", "cwd", "_client", "_connected", "session_id",
+        "_total_cost_micro", "total_turns", "cancelled", "_has_pending_result",
+        "_subagent_depth", "_subagent_op_count", "_task_tool_ids",
+        "_turn_text", "_turn_joined", "_turn_joined_parts", "_got_init",
+        "_last_subagent_emit",
+    )
+
     def __init__(self, model: str | None = None, cwd: str | None = None):
         self.model = model or config.CLAUDE_CODE_MODEL
         self.cwd = cwd or str(config.PROJECTS_DIR)
         self._client: ClaudeSDKClient | None = None
         self._connected = False
         self.session_id: str | None = None
-        self.total_cost: float = 0.0
+        self._total_cost_micro: int = 0  # accumulated in integer micro-USD
         self.total_turns: int = 0
         self.cancelled = False
         self._has_pending_result = False
         self._subagent_depth: int = 0
         self._subagent_op_count: int = 0
-        self._task_tool_ids: set[str] = set()  # ToolUseBlock IDs for Task tools
+        self._task_tool_ids: list[str] = []  # Open Task tool IDs (depth rarely > 3, a list beats hashing)
+        self._turn_text: list[str] = []  # Text streamed during the current run()
+        self._turn_joined = ""  # "".join(_turn_text[:_turn_joined_parts]), extended lazily
+        self._turn_joined_parts = 0
+        self._got_init = False  # SystemMessage(init) seen for the current run()
+        self._last_subagent_emit = 0.0  # monotonic time of last subagent progress event
+
+    @property
+    def total_cost(self) -> float:
+        """Total spend in USD across all turns of this session."""
+        return self._total_cost_micro / 1_000_000
 
     async def connect(self):
         """Initialize the SDK client."""
-        # Strip nesting protection vars and API key so OAuth token is used
-        env = {
-            "CLAUDECODE": "",
-            "CLAUDE_CODE_ENTRYPOINT": "",
-            "ANTHROPIC_API_KEY": "",  # Clear so OAuth token takes precedence
-        }
-        # Pass through OAuth token
-        oauth = os.environ.get("CLAUDE_CODE_OAUTH_TOKEN")
-        if oauth:
-            env["CLAUDE_CODE_OAUTH_TOKEN"] = oauth
-
         options = ClaudeCodeOptions(
             model=self.model,
             system_prompt={"type": "preset", "preset": "claude_code", "append": JARVIS_SYSTEM_PROMPT},
@@ -147,7 +235,7 @@ class ClaudeCodeSession:
             permission_mode="acceptEdits",
             cwd=self.cwd,
             max_turns=30,
-            env=env,
+            env=_SESSION_ENV,
             include_partial_messages=True,
         )
 
@@ -206,9 +294,42 @@ class ClaudeCodeSession:
     async def run(self, prompt: str, on_chunk=None, on_tool_activity=None) -> str:
         """Send a prompt and stream results back via callbacks.
 
-        on_chunk(text) — called with text fragments as they arrive
+        on_chunk(text) — called with batched text fragments as they arrive
         on_tool_activity(event, tool_name, data) — called for tool start/result
         """
+        if not on_chunk:
+            return await self._run(prompt, None, on_tool_activity)
+
+        buf = ChunkBuffer(on_chunk)
+        if on_tool_activity:
+            notify = on_tool_activity
+
+            def on_tool_activity(event, tool_name, data):
+                buf.flush()  # keep text ahead of the tool row it precedes
+                notify(event, tool_name, data)
+
+        try:
+            return await self._run(prompt, buf.write, on_tool_activity)
+        finally:
+            buf.flush()
+
+    async def _drain_stale_result(self):
+        """Consume messages up to the previous turn's parent ResultMessage."""
+        async for msg in self._client.receive_messages():
+            _log.debug("Drained: %s", type(msg).__name__)
+            if isinstance(msg, ResultMessage):
+                is_parent = not self.session_id or msg.session_id == self.session_id
+                if is_parent:
+                    self.session_id = msg.session_id
+                    if msg.total_cost_usd:
+                        self._total_cost_micro += round(msg.total_cost_usd * 1_000_000)
+                    self.total_turns += msg.num_turns
+                    return
+                _log.debug("Drained subagent ResultMessage (session=%s) — continuing",
+                           msg.session_id)
+        _log.debug("Drain ended (iterator exhausted)")
+
+    async def _run(self, prompt: str, on_chunk, on_tool_activity) -> str:
         if not self._connected:
             await self.connect()
 
@@ -216,38 +337,24 @@ class ClaudeCodeSession:
         self._subagent_depth = 0
         self._subagent_op_count = 0
         self._task_tool_ids.clear()
-        full_text = ""
+        self._turn_text.clear()
+        self._turn_joined = ""
+        self._turn_joined_parts = 0
         turn_start = time.monotonic()
 
         # Drain any stale parent ResultMessage from a previous turn (with timeout).
         if self._has_pending_result:
             _log.debug("Draining stale ResultMessage from previous turn")
             try:
-                drain_iter = self._client.receive_messages().__aiter__()
-                drain_deadline = time.monotonic() + _DRAIN_TIMEOUT
-                while time.monotonic() < drain_deadline:
-                    remaining = drain_deadline - time.monotonic()
-                    try:
-                        msg = await asyncio.wait_for(drain_iter.__anext__(), timeout=remaining)
-                    except (asyncio.TimeoutError, StopAsyncIteration):
-                        _log.debug("Drain ended (timeout or iterator exhausted)")
-                        break
-                    _log.debug("Drained: %s", type(msg).__name__)
-                    if isinstance(msg, ResultMessage):
-                        is_parent = not self.session_id or msg.session_id == self.session_id
-                        if is_parent:
-                            self.session_id = msg.session_id
-                            if msg.total_cost_usd:
-                                self.total_cost += msg.total_cost_usd
-                            self.total_turns += msg.num_turns
-                            break
-                        _log.debug("Drained subagent ResultMessage (session=%s) — continuing",
-                                   msg.session_id)
+                # One deadline for the whole drain instead of a wait_for per message
+                await asyncio.wait_for(self._drain_stale_result(), timeout=_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                _log.debug("Drain ended (timeout)")
             except Exception as e:
                 _log.debug("Drain exception: %s", e)
             self._has_pending_result = False
 
-        _log.debug("Sending prompt: %s", prompt[:200])
+        _log.debug("Sending prompt: %.200s", prompt)
         await self._client.query(prompt)
 
         # Use receive_messages() instead of receive_response() so we control
@@ -255,7 +362,7 @@ class ClaudeCodeSession:
         # which breaks when subagents produce their own ResultMessage before the
         # parent conversation finishes.
         got_result = False
-        got_init = False  # Track if we've seen SystemMessage(init) for THIS turn
+        self._got_init = False  # Track if we've seen SystemMessage(init) for THIS turn
         msg_count = 0
         last_msg_type = ""
         try:
@@ -264,7 +371,7 @@ class ClaudeCodeSession:
             _log.error("Failed to create message iterator: %s", e)
             if on_chunk:
                 on_chunk(f"\n\n*(Error: {e})*")
-            return full_text
+            return ""
 
         while True:
             # Check overall turn timeout
@@ -309,118 +416,30 @@ class ClaudeCodeSession:
 
             last_msg_type = type(message).__name__
 
-            # Log every message type for debugging
-            _log.debug("MSG type=%s repr=%s", last_msg_type, repr(message)[:300])
+            # Log every message type for debugging. Truncation uses %-precision
+            # so repr() only runs when the record is actually emitted.
+            _log.debug("MSG type=%s repr=%.300r", last_msg_type, message)
 
             if self.cancelled:
                 _log.debug("Cancelled — breaking out of receive loop")
                 break
 
-            if isinstance(message, SystemMessage):
-                if message.subtype == "init" and hasattr(message, "data"):
-                    got_init = True
-                    sid = message.data.get("session_id")
-                    if sid:
-                        self.session_id = sid
-                        _log.debug("Session ID: %s", sid)
-                elif message.subtype == "task_started" and hasattr(message, "data"):
-                    desc = message.data.get("description", "subagent")
-                    _log.debug("Subagent started: %s (task_id=%s)", desc, message.data.get("task_id"))
-                    # Don't send activity — ToolUseBlock already displayed "Subagent: ..."
-
-            elif isinstance(message, AssistantMessage):
-                for block in message.content:
-                    if isinstance(block, ToolUseBlock):
-                        if on_tool_activity:
-                            if self._subagent_depth == 0:
-                                on_tool_activity("start", block.name, block.input)
-                            else:
-                                # Inside a sub-agent — collapse into progress update
-                                self._subagent_op_count += 1
-                                on_tool_activity("subagent_tool", block.name, block.input)
-                        if block.name == "Task":
-                            self._subagent_depth += 1
-                            self._subagent_op_count = 0
-                            self._task_tool_ids.add(block.id)
-                            _log.debug("Task tool started (id=%s) — depth now %d", block.id, self._subagent_depth)
-                        _log.debug("Tool use: %s %s (depth=%d)", block.name, str(block.input)[:200], self._subagent_depth)
-                    elif isinstance(block, TextBlock) and block.text:
-                        # Normally text is already streamed via StreamEvent text_deltas
-                        # (include_partial_messages=True). But synthetic/error messages
-                        # from the SDK (e.g. auth failures) skip StreamEvent entirely.
-                        # Forward the text if it wasn't already streamed.
-                        if block.text not in full_text:
-                            _log.debug("Assistant text block (NOT streamed, forwarding): %s", block.text[:200])
-                            full_text += block.text
-                            if on_chunk:
-                                on_chunk(block.text)
-                        else:
-                            _log.debug("Assistant text block (already streamed): %s", block.text[:200])
-
-            elif isinstance(message, UserMessage):
-                if hasattr(message, "content"):
-                    content = message.content if isinstance(message.content, list) else [message.content]
-                    for block in content:
-                        if isinstance(block, ToolResultBlock):
-                            is_task_result = hasattr(block, 'tool_use_id') and block.tool_use_id in self._task_tool_ids
-                            result_text = _format_tool_result("", block.content)
-                            if is_task_result:
-                                self._task_tool_ids.discard(block.tool_use_id)
-                                _log.debug("Task tool result (id=%s): %s", block.tool_use_id, result_text[:200])
-                                # Surface a summary of subagent's final output
-                                if on_tool_activity:
-                                    on_tool_activity("subagent_result", "", {"summary": result_text, "is_error": block.is_error})
-                            elif self._subagent_depth > 0:
-                                # Forward subagent internal tool results instead of suppressing
-                                if on_tool_activity:
-                                    on_tool_activity("subagent_result", "", {"summary": result_text, "is_error": block.is_error, "depth": self._subagent_depth})
-                            elif on_tool_activity:
-                                on_tool_activity("result", "", {"summary": result_text, "is_error": block.is_error})
-                            _log.debug("Tool result (error=%s, depth=%d): %s", block.is_error, self._subagent_depth, str(block.content)[:200])
-
-            elif isinstance(message, StreamEvent):
-                event = message.event
-                if isinstance(event, dict):
-                    delta = event.get("delta", {})
-                    if delta.get("type") == "text_delta":
-                        text = delta.get("text", "")
-                        if text:
-                            full_text += text
-                            if on_chunk:
-                                on_chunk(text)
-
-            elif isinstance(message, ResultMessage):
-                is_parent = not self.session_id or message.session_id == self.session_id
-
-                # Stale ResultMessage detection: if we get a ResultMessage before
-                # seeing SystemMessage(init) for this turn, it belongs to the
-                # PREVIOUS turn (the drain missed it). Skip it instead of breaking.
-                if not got_init:
-                    _log.warning("STALE ResultMessage (before init) — skipping "
-                                 "(turns=%d, cost=$%.4f, error=%s)",
-                                 message.num_turns, message.total_cost_usd or 0, message.is_error)
-                    if message.total_cost_usd:
-                        self.total_cost += message.total_cost_usd
-                    self.total_turns += message.num_turns
-                    continue
-
-                if message.total_cost_usd:
-                    self.total_cost += message.total_cost_usd
-                self.total_turns += message.num_turns
-                _log.debug("Result: parent=%s, turns=%d, cost=$%.4f, error=%s",
-                           is_parent, message.num_turns, message.total_cost_usd or 0, message.is_error)
-                if is_parent:
-                    self.session_id = message.session_id
-                    got_result = True
-                    break  # Parent done — stop the loop
-                else:
-                    # Sub-agent completed — decrement depth but keep going
-                    self._subagent_depth = max(0, self._subagent_depth - 1)
-                    _log.debug("Subagent ResultMessage — depth now %d, ops=%d",
-                               self._subagent_depth, self._subagent_op_count)
-                    if self._subagent_depth == 0 and on_tool_activity:
-                        on_tool_activity("subagent_done", "", {"op_count": self._subagent_op_count})
-
+            # Stream deltas dominate, so they are matched first
+            match message:
+                case StreamEvent():
+                    self._on_stream_event(message, on_chunk)
+                case AssistantMessage():
+                    self._on_assistant(message, on_chunk, on_tool_activity)
+                case UserMessage():
+                    self._on_user(message, on_tool_activity)
+                case SystemMessage():
+                    self._on_system(message)
+                case ResultMessage():
+                    if self._on_result(message, on_tool_activity):
+                        got_result = True
+                        break  # Parent done — stop the loop
+
+        full_text = self._turn_text_so_far()
         total_time = time.monotonic() - turn_start
         _log.debug("run() finished: got_result=%s, msgs=%d, text=%d chars, %.1fs",
                    got_result, msg_count, len(full_text), total_time)
@@ -432,6 +451,134 @@ class ClaudeCodeSession:
 
         return full_text
 
+    def _subagent_emit_due(self) -> bool:
+        """Rate-limit subagent tool starts to one per _SUBAGENT_EMIT_INTERVAL."""
+        now = time.monotonic()
+        if now - self._last_subagent_emit < _SUBAGENT_EMIT_INTERVAL:
+            return False
+        self._last_subagent_emit = now
+        return True
+
+    # ── Message handlers, dispatched from the receive loop in _run() ──
+
+    def _on_system(self, message: SystemMessage):
+        if message.subtype == "init":
+            self._got_init = True
+            sid = message.data.get("session_id")
+            if sid:
+                self.session_id = sid
+                _log.debug("Session ID: %s", sid)
+        elif message.subtype == "task_started":
+            desc = message.data.get("description", "subagent")
+            _log.debug("Subagent started: %s (task_id=%s)", desc, message.data.get("task_id"))
+            # Don't send activity — ToolUseBlock already displayed "Subagent: ..."
+
+    def _turn_text_so_far(self) -> str:
+        """Text of the current run(); only parts added since the last call are joined."""
+        if self._turn_joined_parts < len(self._turn_text):
+            self._turn_joined += "".join(self._turn_text[self._turn_joined_parts:])
+            self._turn_joined_parts = len(self._turn_text)
+        return self._turn_joined
+
+    def _on_assistant(self, message: AssistantMessage, on_chunk, on_tool_activity):
+        for block in message.content:
+            if isinstance(block, ToolUseBlock):
+                # Names arrive freshly decoded from JSON; interning lets the
+                # category/formatter lookups downstream hit on identity
+                name = sys.intern(block.name)
+                if on_tool_activity:
+                    if self._subagent_depth == 0:
+                        on_tool_activity("start", name, block.input)
+                    else:
+                        # Inside a sub-agent — collapse into progress update
+                        self._subagent_op_count += 1
+                        if self._subagent_emit_due():
+                            on_tool_activity("subagent_tool", name, block.input)
+                if name == "Task":
+                    self._subagent_depth += 1
+                    self._subagent_op_count = 0
+                    self._last_subagent_emit = 0.0  # first op of a new subagent always shows
+                    self._task_tool_ids.append(block.id)
+                    _log.debug("Task tool started (id=%s) — depth now %d", block.id, self._subagent_depth)
+                _log.debug("Tool use: %s %.200s (depth=%d)", name, block.input, self._subagent_depth)
+            elif isinstance(block, TextBlock) and block.text:
+                # Normally text is already streamed via StreamEvent text_deltas
+                # (include_partial_messages=True). But synthetic/error messages
+                # from the SDK (e.g. auth failures) skip StreamEvent entirely.
+                # Forward the text if it wasn't already streamed.
+                if block.text not in self._turn_text_so_far():
+                    _log.debug("Assistant text block (NOT streamed, forwarding): %.200s", block.text)
+                    self._turn_text.append(block.text)
+                    if on_chunk:
+                        on_chunk(block.text)
+                else:
+                    _log.debug("Assistant text block (already streamed): %.200s", block.text)
+
+    def _on_user(self, message: UserMessage, on_tool_activity):
+        content = message.content
+        if not isinstance(content, list):
+            return  # Plain-text echo of the prompt — no tool results
+        for block in content:
+            if isinstance(block, ToolResultBlock):
+                is_task_result = block.tool_use_id in self._task_tool_ids
+                result_text = _format_tool_result("", block.content)
+                if is_task_result:
+                    self._task_tool_ids.remove(block.tool_use_id)
+                    _log.debug("Task tool result (id=%s): %.200s", block.tool_use_id, result_text)
+                    # Surface a summary of subagent's final output
+                    if on_tool_activity:
+                        on_tool_activity("subagent_result", "", {"summary": result_text, "is_error": block.is_error})
+                elif self._subagent_depth > 0:
+                    # Forward subagent internal tool results
+                    if on_tool_activity:
+                        on_tool_activity("subagent_result", "", {"summary": result_text, "is_error": block.is_error, "depth": self._subagent_depth})
+                elif on_tool_activity:
+                    on_tool_activity("result", "", {"summary": result_text, "is_error": block.is_error})
+                _log.debug("Tool result (error=%s, depth=%d): %.200s", block.is_error, self._subagent_depth, block.content)
+
+    def _on_stream_event(self, message: StreamEvent, on_chunk):
+        event = message.event
+        if isinstance(event, dict):
+            delta = event.get("delta", {})
+            if delta.get("type") == "text_delta":
+                text = delta.get("text", "")
+                if text:
+                    self._turn_text.append(text)
+                    if on_chunk:
+                        on_chunk(text)
+
+    def _on_result(self, message: ResultMessage, on_tool_activity) -> bool:
+        """Account for a ResultMessage; True when it ends the parent turn."""
+        is_parent = not self.session_id or message.session_id == self.session_id
+
+        # Stale ResultMessage detection: if we get a ResultMessage before
+        # seeing SystemMessage(init) for this turn, it belongs to the
+        # PREVIOUS turn (the drain missed it). Skip it instead of breaking.
+        if not self._got_init:
+            _log.warning("STALE ResultMessage (before init) — skipping "
+                         "(turns=%d, cost=$%.4f, error=%s)",
+                         message.num_turns, message.total_cost_usd or 0, message.is_error)
+            if message.total_cost_usd:
+                self._total_cost_micro += round(message.total_cost_usd * 1_000_000)
+            self.total_turns += message.num_turns
+            return False
+
+        if message.total_cost_usd:
+            self._total_cost_micro += round(message.total_cost_usd * 1_000_000)
+        self.total_turns += message.num_turns
+        _log.debug("Result: parent=%s, turns=%d, cost=$%.4f, error=%s",
+                   is_parent, message.num_turns, message.total_cost_usd or 0, message.is_error)
+        if is_parent:
+            self.session_id = message.session_id
+            return True
+        # Sub-agent completed — decrement depth but keep going
+        self._subagent_depth = max(0, self._subagent_depth - 1)
+        _log.debug("Subagent ResultMessage — depth now %d, ops=%d",
+                   self._subagent_depth, self._subagent_op_count)
+        if self._subagent_depth == 0 and on_tool_activity:
+            on_tool_activity("subagent_done", "", {"op_count": self._subagent_op_count})
+        return False
+
     async def cancel(self):
         """Cancel the current operation."""
         self.cancelled = True
@@ -5,74 +5,75 @@ from google.genai import types
 CODE_TOOLS = [
     types.Tool(function_declarations=[
         # ── Code tools ──
+        # Descriptions are kept terse: the schemas ship with every request.
         types.FunctionDeclaration(
             name="run_command",
-            description="Execute a shell command. Use for git, npm, python, build tools, etc.",
+            description="Run a shell command.",
             parameters_json_schema={
                 "type": "object",
                 "properties": {
-                    "command": {"type": "string", "description": "The shell command to execute"},
-                    "cwd": {"type": "string", "description": "Working directory relative to ~/Desktop/projects (optional)"},
+                    "command": {"type": "string"},
+                    "cwd": {"type": "string", "description": "Relative to ~/Desktop/projects"},
                 },
                 "required": ["command"],
             },
         ),
         types.FunctionDeclaration(
             name="read_file",
-            description="Read a file's contents. Path relative to ~/Desktop/projects or absolute.",
+            description="Read a file.",
             parameters_json_schema={
                 "type": "object",
                 "properties": {
-                    "path": {"type": "string", "description": "File path to read"},
+                    "path": {"type": "string"},
                 },
                 "required": ["path"],
             },
         ),
         types.FunctionDeclaration(
             name="write_file",
-            description="Create or overwrite a file with given content.",
+            description="Create or overwrite a file.",
             parameters_json_schema={
                 "type": "object",
                 "properties": {
-                    "path": {"type": "string", "description": "File path to write"},
-                    "content": {"type": "string", "description": "Full file content"},
+                    "path": {"type": "string"},
+                    "content": {"type": "string"},
                 },
                 "required": ["path", "content"],
             },
         ),
         types.FunctionDeclaration(
             name="edit_file",
-            description="Replace the first occurrence of old_text with new_text in a file. Read the file first to get exact text.",
+            description="Replace first old_text match with new_text.",
             parameters_json_schema={
                 "type": "object",
                 "properties": {
-                    "path": {"type": "string", "description": "File path to edit"},
-                    "old_text": {"type": "string", "description": "Exact text to find (must match precisely)"},
-                    "new_text": {"type": "string", "description": "Replacement text"},
+                    "path": {"type": "string"},
+                    "old_text": {"type": "string", "description": "Exact existing text"},
+                    "new_text": {"type": "string"},
                 },
                 "required": ["path", "old_text", "new_text"],
             },
         ),
         types.FunctionDeclaration(
             name="list_files",
-            description="List files in a directory with optional glob pattern.",
+            description="List directory files.",
             parameters_json_schema={
                 "type": "object",
                 "properties": {
-                    "path": {"type": "string", "description": "Directory path (default: projects root)"},
-                    "pattern": {"type": "string", "description": "Glob pattern like '*.py' or '**/*.ts' (default: *)"},
+                    "path": {"type": "string"},
+                    "pattern": {"type": "string", "description": "Glob, e.g. '**/*.ts'"},
                 },
             },
         ),
         types.FunctionDeclaration(
             name="search_files",
-            description="Search file contents using regex pattern (ripgrep). Returns matching lines with filenames and line numbers.",
+            description="Regex-search file contents (ripgrep).",
             parameters_json_schema={
                 "type": "object",
                 "properties": {
-                    "pattern": {"type": "string", "description": "Regex search pattern"},
-                    "path": {"type": "string", "description": "Directory to search (default: projects root)"},
-                    "file_glob": {"type": "string", "description": "File glob filter like '*.py' (optional)"},
+                    "pattern": {"type": "string", "description": "Regex"},
+                    "path": {"type": "string"},
+                    "file_glob": {"type": "string", "description": "e.g. '*.py'"},
                 },
                 "required": ["pattern"],
             },
@@ -83,92 +84,43 @@ CODE_TOOLS = [
 ]
 
 CODE_SYSTEM_PROMPT = """\
-You are Jarvis, Dylan's personal AI coding assistant. You run on Dylan's Mac \
-from ~/Desktop/projects/jarvis/.
-
-The user interacts with you through a chat window. Every tool call you make is \
-shown in real time as a color-coded activity feed — the user sees what you read, \
-edit, search, and run. Be purposeful with each action.
-
-IMPORTANT: Before making tool calls, ALWAYS emit a short text explanation of \
-what you're about to do and why. The user can see your tool calls but not your \
-reasoning — narrate your thought process so they can follow along. Examples:
-- "Let me read the config to see how routes are set up." → read_file
-- "I'll search for where this function is called." → search_files
-- "Updating the handler to fix the off-by-one error." → edit_file
-Keep narration to 1 line. Do NOT narrate trivially obvious actions in sequence \
-(e.g. don't say "now I'll read file X" if you just said "let me check files X and Y").
-
-# Tone and style
-
-Be concise and direct. Answer in 1-4 lines unless the user asks for detail. \
-Do not add preamble ("Sure, I can help with that...") or postamble \
-("Let me know if you need anything else"). One-word answers are fine when appropriate.
-
-Format with markdown. Keep responses short — this is a chat window, not a document.
-
-Do NOT add comments, docstrings, or type annotations to code unless asked. \
-Only add comments where logic isn't self-evident.
-
-ALWAYS respond with text after using tools. Never end a turn silently with only \
-tool calls — the user needs to see your conclusion.
-
-# Tool usage
-
-NEVER propose changes to code you haven't read. Read first, then modify.
-
-When editing, first understand the file's conventions — mimic code style, use \
-existing libraries and patterns. Never assume a library is available; check the \
-codebase first.
-
-Be efficient. Use the minimum tool calls needed:
-- Don't repeat a search you already did.
-- Don't read a file you already read in this conversation.
-- Don't list_files to browse around. Only if you need a specific filename.
-- Be specific with search patterns — avoid broad sweeps.
-
-When you need multiple independent pieces of information, describe what you're \
-doing, then make your tool calls.
-
-# Coding guidelines
-
-Only make changes that are directly requested or clearly necessary. \
-Avoid over-engineering:
-- Don't add features, refactoring, or "improvements" beyond what was asked.
-- Don't add error handling for scenarios that can't happen.
-- Don't create abstractions for one-time operations.
-- Don't design for hypothetical future requirements.
-- If something is unused, delete it completely — no backwards-compat shims.
-
-Follow security best practices. Never introduce command injection, XSS, SQL \
-injection, or other vulnerabilities. Never log or expose secrets.
-
-# Action safety
-
-You can freely take local, reversible actions — reading files, editing code, \
-running tests. For destructive or hard-to-reverse actions (deleting files, \
-force operations, modifying git history), the approval gate will ask the user.
-
-Don't use destructive actions as shortcuts. Investigate unexpected state before \
-overwriting. If you discover unfamiliar files or branches, ask before deleting.
-
-# Workflow
-
-- Editing: read target file → edit_file (find & replace) → respond with summary
-- New files: use write_file
-- Commands requiring user approval will be gated automatically
-
-NEVER use sudo. NEVER start servers or background processes. NEVER use & in commands. \
-NEVER run destructive commands (rm -rf, etc).
-
-# Web search
-
-You have Google Search available. Use it when you need:
-- Current documentation, API references, or library usage examples
-- Error messages or stack traces you don't recognize
-- Recent releases, changelogs, or compatibility info
-- Any factual question where your training data may be outdated
-
-Search results are automatically grounded — just ask naturally and the search \
-will be triggered when needed.
+You are Jarvis, Dylan's personal AI coding assistant, running on Dylan's Mac \
+from ~/Desktop/projects/jarvis/. The user chats with you in a window that shows \
+every tool call live as an activity feed.
+
+<narrate>
+Before tool calls, write 1 line saying what you'll do and why (the user sees \
+calls, not reasoning). Skip narration for obvious follow-ups.
+</narrate>
+
+<style>
+- Concise and direct: 1-4 lines unless asked for detail. No preamble or postamble.
+- Markdown, short — this is a chat window.
+- No added comments, docstrings or type annotations unless asked or logic is non-obvious.
+- Always end a turn with text, never with only tool calls.
+</style>
+
+<tools>
+- Read code before changing it. Match the file's conventions; check a library is used before relying on it.
+- Minimum calls: never repeat a search or re-read a file; no browsing with \
+list_files; use specific search patterns.
+- Edit: read_file → edit_file → summary. New files: write_file.
+- Google Search: use for current docs/APIs, unfamiliar errors, releases, or \
+anything your training may have outdated.
+</tools>
+
+<scope>
+Change only what was asked or clearly needed: no extra features, refactors, \
+speculative error handling, one-off abstractions, or compat shims — delete \
+unused code outright. No injection/XSS/SQLi; never log or expose secrets.
+</scope>
+
+<safety>
+- Local reversible actions (read, edit, test) are fine; destructive ones \
+(deleting, force ops, git history) go through the approval gate.
+- Investigate unexpected state before overwriting; ask before deleting \
+unfamiliar files or branches.
+- NEVER use sudo, start servers/background processes, use &, or run \
+destructive commands (rm -rf, etc).
+</safety>
 """
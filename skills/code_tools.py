@@ -2,25 +2,58 @@
 via function calling and returns a dict suitable for FunctionResponse."""
 
 import asyncio
+import functools
+import glob
+import heapq
+import os
+import re
+import signal
+import stat
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
 import config as _config
 PROJECTS_DIR = _config.PROJECTS_DIR
 MAX_OUTPUT_CHARS = 12_000
 COMMAND_TIMEOUT = 30
+MAX_CONCURRENT_PROCS = 4
+
+# Caps live subprocesses (and their pipe buffers) across all panels; extra
+# tool calls queue here instead of forking at once. Created per event loop,
+# since an asyncio.Semaphore can't be shared between loops.
+_proc_sem: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+READ_CACHE_SIZE = 128
+# Bytes that always cover MAX_OUTPUT_CHARS of UTF-8; larger files are only
+# partially decoded.
+_READ_LIMIT_BYTES = MAX_OUTPUT_CHARS * 4
+
+# read_file results keyed by resolved path → (mtime_ns, size, result).
+# A stat() revalidates each hit, so edits made by any means are picked up.
+_READ_CACHE: OrderedDict[Path, tuple[int, int, dict]] = OrderedDict()
+# read_file runs on worker threads (see SkillRouter._exec_tool); every
+# _READ_CACHE access goes through this lock.
+_READ_CACHE_LOCK = threading.Lock()
 
 
 def _resolve_path(path: str) -> Path:
     """Resolve path relative to PROJECTS_DIR, jail-checked."""
+    # Resolved on every call: a cached answer would miss a path that was
+    # swapped for a symlink pointing outside the jail.
     p = Path(path).expanduser()
     if not p.is_absolute():
         p = PROJECTS_DIR / p
     resolved = p.resolve()
-    if not str(resolved).startswith(str(PROJECTS_DIR.resolve())):
+    if not str(resolved).startswith(_resolved_base(PROJECTS_DIR)):
         raise ValueError(f"Path outside allowed directory: {path}")
     return resolved
 
 
+@functools.lru_cache(maxsize=4)
+def _resolved_base(base: Path) -> str:
+    return str(base.resolve())
+
+
 def _truncate(text: str) -> str:
     if len(text) > MAX_OUTPUT_CHARS:
         return text[:MAX_OUTPUT_CHARS] + f"\n... (truncated, {len(text)} total chars)"
@@ -38,30 +71,77 @@ _BLOCKED_PATTERNS = [
     "wget | sh", "wget | bash",
     "> /dev/sd", "shutdown", "reboot",
 ]
+# One case-insensitive scan for every pattern (the old per-pattern loop
+# lowercased the command, so mixed-case entries like SimpleHTTPServer
+# could never match).
+_BLOCKED_RE = re.compile("|".join(map(re.escape, _BLOCKED_PATTERNS)), re.IGNORECASE)
+_BLOCKED_BY_LOWER = {p.lower(): p for p in _BLOCKED_PATTERNS}
 
 
-async def run_command(command: str, cwd: str | None = None) -> dict:
-    """Execute a shell command."""
+def _check_command(command: str) -> str | None:
+    """Return an error message if the command is not allowed."""
     # Block background processes (& at end)
     stripped = command.rstrip()
     if stripped.endswith("&"):
-        return {"error": "Background processes (&) are not allowed."}
+        return "Background processes (&) are not allowed."
     # Block dangerous patterns
-    cmd_lower = command.lower()
-    for pattern in _BLOCKED_PATTERNS:
-        if pattern in cmd_lower:
-            return {"error": f"Blocked command pattern: {pattern}"}
-    work_dir = _resolve_path(cwd) if cwd else PROJECTS_DIR
-    proc = await asyncio.create_subprocess_shell(
-        command,
-        cwd=str(work_dir),
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
+    m = _BLOCKED_RE.search(command)
+    if m:
+        return f"Blocked command pattern: {_BLOCKED_BY_LOWER[m.group(0).lower()]}"
+    return None
+
+
+def _proc_slot() -> asyncio.Semaphore:
+    global _proc_sem
+    loop = asyncio.get_running_loop()
+    if _proc_sem is None or _proc_sem[0] is not loop:
+        _proc_sem = (loop, asyncio.Semaphore(MAX_CONCURRENT_PROCS))
+    return _proc_sem[1]
+
+
+async def _run_shell(command: str, work_dir: Path) -> dict:
+    async with _proc_slot():
+        proc = await asyncio.create_subprocess_shell(
+            command,
+            cwd=str(work_dir),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,  # own process group, so a timeout kills the whole tree
+        )
+        return await _collect(proc)
+
+
+async def _run_exec(argv: list[str], work_dir: Path) -> dict:
+    """Run a program directly — no /bin/sh in between, no quoting needed."""
+    async with _proc_slot():
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *argv,
+                cwd=str(work_dir),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+        except FileNotFoundError:
+            return {"error": f"{argv[0]} not found"}
+        return await _collect(proc)
+
+
+async def _collect(proc: asyncio.subprocess.Process) -> dict:
     try:
         stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=COMMAND_TIMEOUT)
     except asyncio.TimeoutError:
-        proc.kill()
+        # Kill the whole group (a shell's children hold the pipes open too),
+        # then drain to EOF and reap so the pipes and transport close now
+        # rather than lingering until GC.
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        try:
+            await asyncio.wait_for(proc.communicate(), timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
         return {"error": f"Command timed out after {COMMAND_TIMEOUT}s"}
 
     out = stdout.decode(errors="replace")
@@ -72,23 +152,59 @@ async def run_command(command: str, cwd: str | None = None) -> dict:
     return result
 
 
+async def run_command(command: str, cwd: str | None = None) -> dict:
+    """Execute a shell command."""
+    if error := _check_command(command):
+        return {"error": error}
+    work_dir = _resolve_path(cwd) if cwd else PROJECTS_DIR
+    return await _run_shell(command, work_dir)
+
+
 def read_file(path: str) -> dict:
-    """Read a file's contents."""
+    """Read a file's contents (cached until the file's mtime or size changes)."""
     resolved = _resolve_path(path)
-    if not resolved.exists():
+    try:
+        st = resolved.stat()
+    except OSError:
         return {"error": f"File not found: {path}"}
-    if not resolved.is_file():
+    if not stat.S_ISREG(st.st_mode):
         return {"error": f"Not a file: {path}"}
-    content = resolved.read_text(errors="replace")
-    return {"path": str(resolved), "content": _truncate(content), "lines": content.count("\n") + 1}
+    with _READ_CACHE_LOCK:
+        cached = _READ_CACHE.get(resolved)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            _READ_CACHE.move_to_end(resolved)
+            return dict(cached[2])
+    if st.st_size <= _READ_LIMIT_BYTES:
+        content = resolved.read_text(errors="replace")
+        text, lines = _truncate(content), content.count("\n") + 1
+    else:
+        # Decode only the head; the rest is scanned in binary for the line count
+        with resolved.open("rb") as f:
+            head = f.read(_READ_LIMIT_BYTES)
+            newlines = head.count(b"\n")
+            while chunk := f.read(1 << 20):
+                newlines += chunk.count(b"\n")
+        text = (head.decode(errors="replace")[:MAX_OUTPUT_CHARS]
+                + f"\n... (truncated, {st.st_size} total bytes)")
+        lines = newlines + 1
+    result = {"path": str(resolved), "content": text, "lines": lines}
+    with _READ_CACHE_LOCK:
+        _READ_CACHE[resolved] = (st.st_mtime_ns, st.st_size, result)
+        _READ_CACHE.move_to_end(resolved)
+        if len(_READ_CACHE) > READ_CACHE_SIZE:
+            _READ_CACHE.popitem(last=False)
+    return dict(result)
 
 
 def write_file(path: str, content: str) -> dict:
     """Write content to a file (creates or overwrites)."""
     resolved = _resolve_path(path)
     resolved.parent.mkdir(parents=True, exist_ok=True)
-    resolved.write_text(content)
-    return {"path": str(resolved), "bytes_written": len(content.encode())}
+    data = content.encode()  # Encode once; its length is the byte count
+    resolved.write_bytes(data)
+    with _READ_CACHE_LOCK:
+        _READ_CACHE.pop(resolved, None)
+    return {"path": str(resolved), "bytes_written": len(data)}
 
 
 def edit_file(path: str, old_text: str, new_text: str) -> dict:
@@ -97,10 +213,16 @@ def edit_file(path: str, old_text: str, new_text: str) -> dict:
     if not resolved.exists():
         return {"error": f"File not found: {path}"}
     content = resolved.read_text(errors="replace")
-    if old_text not in content:
+    idx = content.find(old_text)  # One scan locates and validates the match
+    if idx < 0:
         return {"error": "old_text not found in file"}
-    updated = content.replace(old_text, new_text, 1)
+    if old_text == new_text:
+        # Nothing to change — skip the write so mtime and caches stay valid
+        return {"path": str(resolved), "replacements": 0}
+    updated = content[:idx] + new_text + content[idx + len(old_text):]
     resolved.write_text(updated)
+    with _READ_CACHE_LOCK:
+        _READ_CACHE.pop(resolved, None)
     return {"path": str(resolved), "replacements": 1}
 
 
@@ -109,32 +231,32 @@ def list_files(path: str = ".", pattern: str = "*") -> dict:
     resolved = _resolve_path(path)
     if not resolved.is_dir():
         return {"error": f"Not a directory: {path}"}
-    files = sorted(
-        str(p.relative_to(resolved))
-        for p in resolved.glob(pattern)
-        if not any(part.startswith(".") for part in p.relative_to(resolved).parts)
-    )[:100]
+    # glob.iglob skips dotfiles and never descends into hidden dirs (.git,
+    # .venv, ...) and yields relative strings, so no Path objects are built.
+    # The "/." check only matters for patterns that name a dotfile outright.
+    files = heapq.nsmallest(100, (
+        rel.rstrip("/") for rel in glob.iglob(pattern, root_dir=resolved, recursive=True)
+        if "/." not in "/" + rel
+    ))
     return {"directory": str(resolved), "files": files, "count": len(files)}
 
 
 async def search_files(pattern: str, path: str = ".", file_glob: str = "") -> dict:
     """Search file contents using ripgrep."""
     resolved = _resolve_path(path)
-    cmd = f"rg --no-heading -n -e {_shell_quote(pattern)}"
+    argv = ["rg", "--no-heading", "-n", "-e", pattern]
     if file_glob:
-        cmd += f" -g {_shell_quote(file_glob)}"
-    cmd += " ."
-    result = await run_command(cmd, cwd=str(resolved))
-    return {
+        argv += ["-g", file_glob]
+    argv.append(".")
+    result = await _run_exec(argv, resolved)
+    found = {
         "pattern": pattern,
         "results": result.get("stdout", ""),
         "exit_code": result.get("exit_code", -1),
     }
-
-
-def _shell_quote(s: str) -> str:
-    """Simple shell quoting."""
-    return "'" + s.replace("'", "'\\''") + "'"
+    if "error" in result:
+        found["error"] = result["error"]  # e.g. rg missing or timed out
+    return found
 
 
 # Dispatch map: tool_name -> executor function
@@ -146,3 +268,9 @@ TOOL_DISPATCH = {
     "list_files": list_files,
     "search_files": search_files,
 }
+
+# Tools with no side effects; identical calls may share one result
+READ_ONLY_TOOLS = frozenset({"read_file", "list_files", "search_files"})
+
+# tool_name -> (executor, is_coroutine), so dispatch doesn't re-inspect per call
+TOOL_EXECUTORS = {name: (fn, asyncio.iscoroutinefunction(fn)) for name, fn in TOOL_DISPATCH.items()}
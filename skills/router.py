@@ -1,31 +1,38 @@
 import asyncio
+import atexit
 import datetime
-import inspect
 import json
 import logging
-import subprocess
+import logging.handlers
+import queue
+import time
+from contextlib import aclosing, asynccontextmanager
 
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from rich.console import Console
-from rich.live import Live
-from rich.markdown import Markdown
-from rich.panel import Panel
 
 import os
 
 import config
 
 _log = logging.getLogger("jarvis.router")
-_log.setLevel(logging.DEBUG)
+_log.setLevel(os.environ.get("JARVIS_ROUTER_LOG_LEVEL", "DEBUG").upper())
 _fh = logging.FileHandler(os.path.join(os.path.dirname(os.path.dirname(__file__)), "jarvis_router.log"))
 _fh.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", datefmt="%H:%M:%S"))
-_log.addHandler(_fh)
+# Records are queued and written by a listener thread, so log calls in the
+# stream loops never block the event loop on disk I/O.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = logging.handlers.QueueListener(_log_queue, _fh, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 from connectors.token_tracker import TokenTracker
 from connectors.claude_proxy import ClaudeProxyClient
-from skills.claude_code import ClaudeCodeSession
+from connectors.rate_limiter import RateLimiter
+from skills.claude_code import ChunkBuffer, ClaudeCodeSession
 from skills.code_assistant import CODE_SYSTEM_PROMPT, CODE_TOOLS
-from skills.code_tools import TOOL_DISPATCH
+from skills.code_tools import READ_ONLY_TOOLS, TOOL_EXECUTORS
 
 console = Console()
 
@@ -47,6 +54,66 @@ DEFAULT_TOOLS = [
     ])
 ]
 
+_ENV_CACHE_TTL = 10.0       # seconds a repo's git context is reused across panel starts
+
+# Cap on Gemini streams open at once across the default chat and all panels.
+# Extra requests wait locally instead of tripping the API's concurrency limit.
+MAX_GEMINI_CONCURRENCY = int(os.environ.get("JARVIS_MAX_GEMINI_CONCURRENCY", "4"))
+_RATE_LIMIT_BACKOFF = 10.0  # seconds to pause on a 429 that carries no retry delay
+_NO_PRICING = {"input": 0, "output": 0}  # Models missing from GEMINI_PRICING
+_USAGE_FLUSH_DELAY = 0.5    # seconds token-usage rows are batched before hitting SQLite
+
+
+def _read_chunk(chunk, function_calls: list) -> str:
+    """Return a stream chunk's text, appending any function calls it carries.
+
+    One pass over the parts; chunk.text would walk them again (and warn
+    about function-call parts). Text follows chunk.text: first candidate
+    only, thought parts skipped.
+    """
+    text = ""
+    for i, candidate in enumerate(chunk.candidates or ()):
+        content = candidate.content
+        if not content or not content.parts:
+            continue
+        for part in content.parts:
+            if part.function_call:
+                function_calls.append(part.function_call)
+            elif i == 0 and part.text and not part.thought:
+                text += part.text
+    return text
+
+
+def _expand_tool_batches(on_tool_activity):
+    """Adapt a per-tool activity callback to the batch events of a parallel tool group.
+
+    Code turns report a concurrently run group as one ("batch_start", names,
+    args_list) and one ("batch_result", names, [(args, result), ...]) event.
+    Callbacks that set `handles_batches = True` receive those as-is; others
+    get the equivalent "start"/"result" events, one per tool.
+    """
+    def expanded(event, tool_name, data):
+        if event == "batch_start":
+            for name, args in zip(tool_name, data):
+                on_tool_activity("start", name, args)
+        elif event == "batch_result":
+            for name, (_, result) in zip(tool_name, data):
+                on_tool_activity("result", name, result)
+        else:
+            on_tool_activity(event, tool_name, data)
+    return expanded
+
+
+def _retry_delay(e: errors.ClientError) -> float:
+    """Seconds the API asked us to back off (google.rpc.RetryInfo), if any."""
+    try:
+        for detail in e.details["error"]["details"]:
+            if detail.get("@type", "").endswith("RetryInfo"):
+                return float(detail["retryDelay"].rstrip("s"))
+    except (KeyError, TypeError, ValueError, AttributeError):
+        pass
+    return _RATE_LIMIT_BACKOFF
+
 DEFAULT_SYSTEM_PROMPT = (
     config.SYSTEM_PROMPT + "\n\n"
     "You have a code assistant for coding tasks. Use it when the user asks about code. "
@@ -54,22 +121,91 @@ DEFAULT_SYSTEM_PROMPT = (
 )
 
 
+# Chat configs are identical for every panel; build them once and share.
+_DEFAULT_CHAT_CONFIG = types.GenerateContentConfig(
+    system_instruction=DEFAULT_SYSTEM_PROMPT,
+    tools=DEFAULT_TOOLS,
+)
+_CODE_CHAT_CONFIG = types.GenerateContentConfig(
+    system_instruction=CODE_SYSTEM_PROMPT,
+    tools=CODE_TOOLS,
+)
+
 
 class SkillRouter:
     def __init__(self, metal_bridge=None):
-        self.gemini = genai.Client(api_key=config.GOOGLE_API_KEY) if config.GOOGLE_API_KEY else None
-        self.claude_proxy = ClaudeProxyClient()
+        # API clients are built on first use (genai.Client alone takes ~150ms)
+        self._gemini: genai.Client | None = None
+        self._claude_proxy: ClaudeProxyClient | None = None
         self.metal = metal_bridge
         self.token_tracker = TokenTracker(config.TOKEN_USAGE_DB)
+        # Usage rows waiting to be written in one batch off the event loop
+        self._pending_usage: list[tuple] = []
+        self._usage_flush: asyncio.TimerHandle | None = None
+        self._usage_writes: set[asyncio.Future] = set()  # In-flight background writes
         # Default conversation session (Gemini Flash)
         self.default_chat = None
         # Per-panel sessions: panel_id → session state
         self._panels: dict[int, dict] = {}
+        # Open panel ids in UI order: the UI's i-th window is _panel_order[i].
+        # Ids are never reused, so a late callback can't reach a newer panel.
+        self._panel_order: list[int] = []
+        self._next_panel_id = 0
         # Session-level token/cost accumulators (shared across panels)
         self._session_prompt_tokens: int = 0
         self._session_completion_tokens: int = 0
         self._session_cost: float = 0.0
         self._session_model: str = ""
+        # Git env context per repo dir → (monotonic ts, .git/index mtime, text)
+        self._env_cache: dict[str, tuple[float, float, str]] = {}
+        # (loop, semaphore) bounding concurrent Gemini streams; see _gemini_slot
+        self._gemini_sem: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+        # RPM/TPM pacing per model → RateLimiter
+        self._limiters: dict[str, RateLimiter] = {}
+
+    @property
+    def gemini(self) -> genai.Client | None:
+        if self._gemini is None and config.GOOGLE_API_KEY:
+            self._gemini = genai.Client(api_key=config.GOOGLE_API_KEY)
+        return self._gemini
+
+    @property
+    def claude_proxy(self) -> ClaudeProxyClient:
+        if self._claude_proxy is None:
+            self._claude_proxy = ClaudeProxyClient()
+        return self._claude_proxy
+
+    def _limiter(self, model: str) -> RateLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limits = config.GEMINI_RATE_LIMITS.get(model, {})
+            limiter = self._limiters[model] = RateLimiter(
+                limits.get("rpm", config.GEMINI_RPM_DEFAULT),
+                limits.get("tpm", config.GEMINI_TPM_DEFAULT),
+            )
+        return limiter
+
+    @asynccontextmanager
+    async def _gemini_slot(self, model: str):
+        """Pace against `model`'s quota, then hold a stream slot for the whole stream.
+
+        The semaphore is created per event loop. A 429 pauses every caller of
+        the model for the server's retry delay before being re-raised.
+        """
+        limiter = self._limiter(model)
+        await limiter.wait()
+        loop = asyncio.get_running_loop()
+        if self._gemini_sem is None or self._gemini_sem[0] is not loop:
+            self._gemini_sem = (loop, asyncio.Semaphore(MAX_GEMINI_CONCURRENCY))
+        async with self._gemini_sem[1]:
+            try:
+                yield
+            except errors.ClientError as e:
+                if e.code == 429:
+                    delay = _retry_delay(e)
+                    _log.warning("%s rate limited — pausing %.0fs", model, delay)
+                    limiter.pause(delay)
+                raise
 
     def _get_panel(self, panel: int) -> dict:
         """Get or create panel session state."""
@@ -85,7 +221,7 @@ class SkillRouter:
             }
         return self._panels[panel]
 
-    def _build_env_context(self, project: str = "") -> str:
+    async def _build_env_context(self, project: str = "") -> str:
         """Build dynamic environment context injected into the first message."""
         lines = [
             f"Date: {datetime.date.today()}",
@@ -96,25 +232,53 @@ class SkillRouter:
         # Git status for the target project or jarvis by default
         git_dir = config.PROJECTS_DIR / (project if project else "jarvis")
         if git_dir.is_dir():
+            lines.append(await self._git_context(git_dir))
+        return "\n".join(lines).rstrip()
+
+    async def _git_context(self, git_dir) -> str:
+        """Git status + recent commits, reused for a few seconds while the index is unchanged."""
+        try:
+            index_mtime = (git_dir / ".git" / "index").stat().st_mtime
+        except OSError:
+            index_mtime = 0.0
+        key = str(git_dir)
+        now = time.monotonic()
+        cached = self._env_cache.get(key)
+        if cached and now - cached[0] < _ENV_CACHE_TTL and cached[1] == index_mtime:
+            return cached[2]
+
+        # Independent git calls — run them concurrently
+        status, log = await asyncio.gather(
+            self._git(git_dir, "status", "--short", "--branch"),
+            self._git(git_dir, "log", "--oneline", "-5"),
+        )
+        parts = []
+        if status is not None:
+            parts.append(f"Git ({git_dir.name}): {status}")
+        if log is not None:
+            parts.append(f"Recent commits:\n{log}")
+        text = "\n".join(parts)
+        self._env_cache[key] = (now, index_mtime, text)
+        return text
+
+    @staticmethod
+    async def _git(cwd, *args: str) -> str | None:
+        """Run a git command; stripped stdout, or None on failure or timeout."""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "git", *args, cwd=str(cwd),
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+            )
             try:
-                result = subprocess.run(
-                    ["git", "status", "--short", "--branch"],
-                    cwd=str(git_dir), capture_output=True, text=True, timeout=5,
-                )
-                if result.returncode == 0:
-                    lines.append(f"Git ({git_dir.name}): {result.stdout.strip()}")
-            except Exception:
-                pass
-            try:
-                result = subprocess.run(
-                    ["git", "log", "--oneline", "-5"],
-                    cwd=str(git_dir), capture_output=True, text=True, timeout=5,
-                )
-                if result.returncode == 0:
-                    lines.append(f"Recent commits:\n{result.stdout.strip()}")
-            except Exception:
-                pass
-        return "\n".join(lines)
+                stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=5)
+            except asyncio.TimeoutError:
+                proc.kill()
+                return None
+        except Exception:
+            return None
+        if proc.returncode != 0:
+            return None
+        return stdout.decode(errors="replace").strip()
 
     def _metal_hud(self, text: str):
         if self.metal:
@@ -134,19 +298,63 @@ class SkillRouter:
         prompt = meta.prompt_token_count or 0
         completion = meta.candidates_token_count or 0
         total = meta.total_token_count or 0
-        self.token_tracker.record(
-            model=model,
-            session_type=session_type,
-            prompt_tokens=prompt,
-            completion_tokens=completion,
-            total_tokens=total,
-        )
+        self._pending_usage.append((datetime.datetime.now().isoformat(), model, session_type,
+                                    prompt, completion, total))
+        self._schedule_usage_flush()
         # Accumulate session totals
         self._session_prompt_tokens += prompt
         self._session_completion_tokens += completion
         self._session_model = model
-        pricing = config.GEMINI_PRICING.get(model, {"input": 0, "output": 0})
+        if not (prompt or completion or total):
+            return
+        pricing = config.GEMINI_PRICING.get(model, _NO_PRICING)
         self._session_cost += (prompt * pricing["input"] + completion * pricing["output"]) / 1_000_000
+        self._limiter(model).charge(total or prompt + completion)
+
+    def _schedule_usage_flush(self):
+        if self._usage_flush is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_usage()  # No loop to defer to — write now
+            return
+        self._usage_flush = loop.call_later(_USAGE_FLUSH_DELAY, self._flush_usage_async)
+
+    def _flush_usage_async(self):
+        self._usage_flush = None
+        rows, self._pending_usage = self._pending_usage, []
+        if rows:
+            write = asyncio.ensure_future(asyncio.to_thread(self.token_tracker.record_many, rows))
+            self._usage_writes.add(write)  # Held until done so it can't be collected mid-write
+            write.add_done_callback(self._usage_write_done)
+
+    def _usage_write_done(self, write: asyncio.Future):
+        self._usage_writes.discard(write)
+        if not write.cancelled() and write.exception() is not None:
+            _log.error("Token usage write failed: %s", write.exception())
+
+    def _take_pending_usage(self) -> list[tuple]:
+        if self._usage_flush is not None:
+            self._usage_flush.cancel()
+            self._usage_flush = None
+        rows, self._pending_usage = self._pending_usage, []
+        return rows
+
+    def flush_usage(self):
+        """Write any pending usage rows now (blocking)."""
+        self.token_tracker.record_many(self._take_pending_usage())
+
+    async def drain_usage(self):
+        """Wait for background usage writes, then write any pending rows."""
+        if self._usage_writes:
+            await asyncio.gather(*self._usage_writes, return_exceptions=True)
+        rows = self._take_pending_usage()
+        if rows:
+            try:
+                await asyncio.to_thread(self.token_tracker.record_many, rows)
+            except Exception as e:
+                _log.error("Token usage write failed: %s", e)
 
     # ── Default conversation (Gemini Flash) ──
 
@@ -157,10 +365,7 @@ class SkillRouter:
             return
         self.default_chat = self.gemini.aio.chats.create(
             model=config.GEMINI_MODEL_DEFAULT,
-            config=types.GenerateContentConfig(
-                system_instruction=DEFAULT_SYSTEM_PROMPT,
-                tools=DEFAULT_TOOLS,
-            ),
+            config=_DEFAULT_CHAT_CONFIG,
         )
         console.print("[green]Default Gemini Flash session ready[/]")
 
@@ -176,39 +381,37 @@ class SkillRouter:
         if not self.default_chat:
             return ("Gemini is unavailable — set GOOGLE_API_KEY in .env to enable voice routing.", None)
 
-        full_response = ""
+        response_parts: list[str] = []  # Joined once at return
         message = user_text
         max_tool_calls = 3
         max_iterations = 3
         total_tool_calls = 0
 
         for _ in range(max_iterations):
-            turn_text = ""
+            turn_parts: list[str] = []
             pending_function_calls = []
 
             try:
-                stream = await asyncio.wait_for(
-                    self.default_chat.send_message_stream(message),
-                    timeout=30.0,
-                )
-                last_chunk = None
-                async for chunk in stream:
-                    last_chunk = chunk
-                    if chunk.text:
-                        turn_text += chunk.text
-                    if chunk.candidates:
-                        for candidate in chunk.candidates:
-                            if candidate.content and candidate.content.parts:
-                                for part in candidate.content.parts:
-                                    if part.function_call:
-                                        pending_function_calls.append(part.function_call)
-                self._record_usage(last_chunk, config.GEMINI_MODEL_DEFAULT, "default")
+                async with self._gemini_slot(config.GEMINI_MODEL_DEFAULT):  # Held until the stream is drained
+                    stream = await asyncio.wait_for(
+                        self.default_chat.send_message_stream(message),
+                        timeout=30.0,
+                    )
+                    last_chunk = None
+                    async with aclosing(stream):
+                        async for chunk in stream:
+                            last_chunk = chunk
+                            text = _read_chunk(chunk, pending_function_calls)
+                            if text:
+                                turn_parts.append(text)
+                    self._record_usage(last_chunk, config.GEMINI_MODEL_DEFAULT, "default")
             except asyncio.TimeoutError:
                 console.print("[yellow]Default session timed out (30s)[/]")
-                full_response += turn_text + "\n*(Timed out.)*"
+                response_parts += turn_parts
+                response_parts.append("\n*(Timed out.)*")
                 break
 
-            full_response += turn_text
+            response_parts += turn_parts
 
             if not pending_function_calls:
                 break
@@ -217,13 +420,13 @@ class SkillRouter:
             function_response_parts = []
             for fc in pending_function_calls:
                 tool_name = fc.name
-                tool_args = dict(fc.args) if fc.args else {}
+                tool_args = fc.args or {}  # Already a plain dict; nothing mutates it
                 total_tool_calls += 1
 
                 # code_assistant → signal skill mode (don't execute here)
                 if tool_name == "code_assistant":
                     console.print(f"\n[bold yellow]Skill triggered:[/] {tool_name}")
-                    return full_response, {
+                    return "".join(response_parts), {
                         "tool_name": tool_name,
                         "arguments": json.dumps(tool_args),
                         "user_text": user_text,
@@ -231,10 +434,11 @@ class SkillRouter:
 
                 # Data tools → execute inline
                 console.print(f"  [dim]Default tool: {tool_name}[/]")
-                executor = TOOL_DISPATCH.get(tool_name)
-                if executor:
+                entry = TOOL_EXECUTORS.get(tool_name)
+                if entry:
+                    executor, is_coro = entry
                     try:
-                        if asyncio.iscoroutinefunction(executor):
+                        if is_coro:
                             result = await executor(**tool_args)
                         else:
                             result = executor(**tool_args)
@@ -255,7 +459,7 @@ class SkillRouter:
 
             message = function_response_parts
 
-        return full_response, None
+        return "".join(response_parts), None
 
     # ── Skill sessions ──
 
@@ -280,27 +484,33 @@ class SkillRouter:
         if not ps["chat"]:
             return "No active chat session"
 
-        full_response = ""
+        response_parts: list[str] = []
+        buf = ChunkBuffer(on_chunk) if on_chunk else None
         try:
-            stream = await asyncio.wait_for(
-                ps["chat"].send_message_stream(user_text),
-                timeout=60.0,
-            )
-            last_chunk = None
-            async for chunk in stream:
-                last_chunk = chunk
-                text = chunk.text
-                if text:
-                    full_response += text
-                    if on_chunk:
-                        on_chunk(text)
-            self._record_usage(last_chunk, config.GEMINI_MODEL_DEFAULT, "skill")
+            async with self._gemini_slot(config.GEMINI_MODEL_DEFAULT):
+                stream = await asyncio.wait_for(
+                    ps["chat"].send_message_stream(user_text),
+                    timeout=60.0,
+                )
+                last_chunk = None
+                async with aclosing(stream):
+                    async for chunk in stream:
+                        last_chunk = chunk
+                        text = chunk.text
+                        if text:
+                            response_parts.append(text)
+                            if buf:
+                                buf.write(text)
+                self._record_usage(last_chunk, config.GEMINI_MODEL_DEFAULT, "skill")
         except asyncio.TimeoutError:
             console.print("[yellow]Gemini followup timed out (60s)[/]")
-            if on_chunk:
-                on_chunk("\n\n*(Request timed out.)*")
+            if buf:
+                buf.write("\n\n*(Request timed out.)*")
+        finally:
+            if buf:
+                buf.flush()
 
-        return full_response
+        return "".join(response_parts)
 
     def approve_command(self, approved: bool, panel: int = 0):
         """Resolve a pending run_command approval for a specific panel."""
@@ -331,28 +541,49 @@ class SkillRouter:
             if ps.get("pending_approval") and not ps["pending_approval"].done():
                 ps["pending_approval"].cancel()
 
+    def open_panel(self) -> int:
+        """Register a new UI window after the existing ones; returns its panel id."""
+        panel = self._next_panel_id
+        self._next_panel_id += 1
+        self._panel_order.append(panel)
+        return panel
+
+    def list_panels(self) -> list[int]:
+        """Open panel ids in display order. Ids are stable — closing never renumbers."""
+        return list(self._panel_order)
+
+    def panel_id(self, index: int) -> int:
+        """Map the UI's dense panel index to its router panel id.
+
+        The mapping follows open_panel/close_panel, not which panels have
+        session state yet. Windows the router was never told about are
+        registered on first use.
+        """
+        while index >= len(self._panel_order):
+            self.open_panel()
+        return self._panel_order[index]
+
     def close_panel(self, panel: int) -> str:
-        """Close a specific panel's session and renumber remaining panels."""
+        """Close a specific panel's session. Other panels keep their ids."""
         ps = self._panels.pop(panel, {})
+        if panel in self._panel_order:
+            self._panel_order.remove(panel)
         name = ps.get("skill_name", "Skill")
         # Close Claude Code session
         session = ps.get("session")
         if session:
             asyncio.ensure_future(session.close())
-        # Renumber: shift panels above the closed one down by 1
-        new_panels: dict[int, dict] = {}
-        for pid, state in self._panels.items():
-            new_panels[pid - 1 if pid > panel else pid] = state
-        self._panels = new_panels
         return f"{name} session closed."
 
-    def close_session(self) -> str:
-        """Close all panel sessions."""
+    async def close_session(self) -> str:
+        """Close all panel sessions and finish writing token usage."""
         for ps in self._panels.values():
             session = ps.get("session")
             if session:
                 asyncio.ensure_future(session.close())
         self._panels.clear()
+        self._panel_order.clear()
+        await self.drain_usage()
         self._session_prompt_tokens = 0
         self._session_completion_tokens = 0
         self._session_cost = 0.0
@@ -416,29 +647,71 @@ class SkillRouter:
 
         ps["chat"] = self.gemini.aio.chats.create(
             model=config.GEMINI_MODEL_CODE,
-            config=types.GenerateContentConfig(
-                system_instruction=CODE_SYSTEM_PROMPT,
-                tools=CODE_TOOLS,
-            ),
+            config=_CODE_CHAT_CONFIG,
         )
 
-        env = self._build_env_context(project)
+        env = await self._build_env_context(project)
         prompt = f"[Environment]\n{env}\n\nUser request: {task}"
         if project:
             prompt += f"\nProject: {project}"
 
         return await self._run_code_turn(prompt, panel, on_chunk, on_tool_activity)
 
+    async def _exec_tool(self, panel: int, tool_name: str, tool_args: dict) -> dict:
+        """Run one code tool; failures come back as {"error": ...}."""
+        _log.debug("panel %d: executing %s", panel, tool_name)
+        entry = TOOL_EXECUTORS.get(tool_name)
+        if not entry:
+            return {"error": f"Unknown tool: {tool_name}"}
+        executor, is_coro = entry
+        try:
+            if is_coro:
+                result = await asyncio.wait_for(executor(**tool_args), timeout=45.0)
+            elif tool_name in READ_ONLY_TOOLS:
+                # Blocking file reads run on a worker thread, so a batch of
+                # them overlaps instead of stalling the loop one by one
+                result = await asyncio.to_thread(executor, **tool_args)
+            else:
+                result = executor(**tool_args)
+        except asyncio.TimeoutError:
+            _log.warning("panel %d tool %s timed out (45s)", panel, tool_name)
+            result = {"error": f"Tool {tool_name} timed out (45s)"}
+        except Exception as e:
+            _log.error("panel %d tool %s error: %s", panel, tool_name, e)
+            result = {"error": str(e)}
+        _log.debug("panel %d tool %s done — error=%s", panel, tool_name,
+                   isinstance(result, dict) and "error" in result)
+        return result
+
     async def _run_code_turn(self, message, panel: int = 0, on_chunk=None, on_tool_activity=None) -> str:
         """Execute the agentic tool-calling loop for a specific panel.
 
-        Streams text to on_chunk. When function calls are detected, executes
-        them, notifies on_tool_activity, sends results back to Gemini, and
-        repeats until Gemini returns a text-only response.
+        Streams text to on_chunk in coalesced batches. When function calls are
+        detected, executes them, notifies on_tool_activity, sends results back
+        to Gemini, and repeats until Gemini returns a text-only response.
         """
+        if on_tool_activity and not getattr(on_tool_activity, "handles_batches", False):
+            on_tool_activity = _expand_tool_batches(on_tool_activity)
+        if not on_chunk:
+            return await self._code_turn_loop(message, panel, None, on_tool_activity)
+
+        buf = ChunkBuffer(on_chunk)
+        if on_tool_activity:
+            notify = on_tool_activity
+
+            def on_tool_activity(event, tool_name, data):
+                buf.flush()  # keep text ahead of the tool row it precedes
+                notify(event, tool_name, data)
+
+        try:
+            return await self._code_turn_loop(message, panel, buf.write, on_tool_activity)
+        finally:
+            buf.flush()
+
+    async def _code_turn_loop(self, message, panel: int, on_chunk, on_tool_activity) -> str:
         ps = self._get_panel(panel)
         ps["cancelled"] = False
-        full_response = ""
+        response_parts: list[str] = []  # Joined once at return
         total_tool_calls = 0
         max_tool_calls = 50
         max_iterations = 30
@@ -448,7 +721,7 @@ class SkillRouter:
                 _log.debug("panel %d turn %d: cancelled before start", panel, iteration + 1)
                 break
 
-            turn_text = ""
+            turn_parts: list[str] = []
             pending_function_calls = []
 
             try:
@@ -457,47 +730,45 @@ class SkillRouter:
                     console.print(f"[yellow]No active chat (panel {panel}) — loop exiting[/]")
                     break
 
-                stream_timeout = 300.0  # 5 min total time for this turn
-                turn_start = asyncio.get_event_loop().time()
-                _log.debug("panel %d turn %d: sending to Gemini...", panel, iteration + 1)
+                async with self._gemini_slot(config.GEMINI_MODEL_CODE):  # Not held while tools run
+                    stream_timeout = 300.0  # 5 min total time for this turn
+                    turn_start = time.monotonic()
+                    deadline = turn_start + stream_timeout
+                    _log.debug("panel %d turn %d: sending to Gemini...", panel, iteration + 1)
 
-                stream = await asyncio.wait_for(
-                    ps["chat"].send_message_stream(message),
-                    timeout=30.0,
-                )
-                _log.debug("panel %d turn %d: stream opened, reading chunks...", panel, iteration + 1)
-                last_chunk = None
-                chunk_count = 0
-                async for chunk in stream:
-                    chunk_count += 1
-                    # Check total turn timeout
-                    elapsed = asyncio.get_event_loop().time() - turn_start
-                    if elapsed > stream_timeout:
-                        _log.warning("panel %d turn %d: stream exceeded %.0fs after %d chunks", panel, iteration + 1, stream_timeout, chunk_count)
-                        console.print(f"[yellow]Stream exceeded {stream_timeout}s (panel {panel}) — stopping[/]")
-                        if on_chunk:
-                            on_chunk("\n\n*(Stream timed out.)*")
-                        break
-
-                    last_chunk = chunk
-                    if ps["cancelled"]:
-                        _log.debug("panel %d turn %d: cancelled mid-stream at chunk %d", panel, iteration + 1, chunk_count)
-                        break
-                    if chunk.text:
-                        turn_text += chunk.text
-                        if on_chunk:
-                            on_chunk(chunk.text)
-                    if chunk.candidates:
-                        for candidate in chunk.candidates:
-                            if candidate.content and candidate.content.parts:
-                                for part in candidate.content.parts:
-                                    if part.function_call:
-                                        pending_function_calls.append(part.function_call)
-
-                elapsed = asyncio.get_event_loop().time() - turn_start
-                _log.debug("panel %d turn %d: stream done — %d chunks, %d func calls, %.1fs, text=%d chars",
-                           panel, iteration + 1, chunk_count, len(pending_function_calls), elapsed, len(turn_text))
-                self._record_usage(last_chunk, config.GEMINI_MODEL_CODE, "code")
+                    stream = await asyncio.wait_for(
+                        ps["chat"].send_message_stream(message),
+                        timeout=30.0,
+                    )
+                    _log.debug("panel %d turn %d: stream opened, reading chunks...", panel, iteration + 1)
+                    last_chunk = None
+                    chunk_count = 0
+                    async with aclosing(stream):  # Release the response even on break/cancel
+                        async for chunk in stream:
+                            chunk_count += 1
+                            # Check total turn timeout
+                            if time.monotonic() > deadline:
+                                _log.warning("panel %d turn %d: stream exceeded %.0fs after %d chunks", panel, iteration + 1, stream_timeout, chunk_count)
+                                console.print(f"[yellow]Stream exceeded {stream_timeout}s (panel {panel}) — stopping[/]")
+                                if on_chunk:
+                                    on_chunk("\n\n*(Stream timed out.)*")
+                                break
+
+                            last_chunk = chunk
+                            if ps["cancelled"]:
+                                _log.debug("panel %d turn %d: cancelled mid-stream at chunk %d", panel, iteration + 1, chunk_count)
+                                break
+                            text = _read_chunk(chunk, pending_function_calls)
+                            if text:
+                                turn_parts.append(text)
+                                if on_chunk:
+                                    on_chunk(text)
+
+                    if _log.isEnabledFor(logging.DEBUG):
+                        _log.debug("panel %d turn %d: stream done — %d chunks, %d func calls, %.1fs, text=%d chars",
+                                   panel, iteration + 1, chunk_count, len(pending_function_calls),
+                                   time.monotonic() - turn_start, sum(map(len, turn_parts)))
+                    self._record_usage(last_chunk, config.GEMINI_MODEL_CODE, "code")
             except asyncio.TimeoutError:
                 _log.warning("panel %d turn %d: TIMEOUT waiting for Gemini", panel, iteration + 1)
                 console.print(f"[yellow]Gemini request timed out (panel {panel}, turn {iteration + 1})[/]")
@@ -517,7 +788,7 @@ class SkillRouter:
             if ps["cancelled"]:
                 break
 
-            full_response += turn_text
+            response_parts += turn_parts
 
             if not pending_function_calls:
                 _log.debug("panel %d turn %d: no function calls — done", panel, iteration + 1)
@@ -531,69 +802,97 @@ class SkillRouter:
             pending_function_calls = pending_function_calls[:remaining]
 
             function_response_parts = []
+            batch: list[tuple[str, dict]] = []  # Ungated calls, run together
+
+            async def run_batch():
+                # Read-only calls run concurrently, and repeats share one
+                # execution. A call that may write waits for the reads before
+                # it, then runs alone, so later reads see its effect. Results
+                # stay in call order.
+                names = [name for name, _ in batch]
+                if on_tool_activity:
+                    if len(batch) == 1:
+                        on_tool_activity("start", names[0], batch[0][1])
+                    else:
+                        on_tool_activity("batch_start", names, [args for _, args in batch])
+                results: list = [None] * len(batch)
+                shared: dict[tuple[str, str], asyncio.Future] = {}
+                reads: list[tuple[int, asyncio.Future]] = []
+
+                async def settle_reads():
+                    done = await asyncio.gather(*[f for _, f in reads])
+                    for (i, _), result in zip(reads, done):
+                        results[i] = result
+                    reads.clear()
+                    shared.clear()
+
+                for i, (name, args) in enumerate(batch):
+                    if name not in READ_ONLY_TOOLS:
+                        await settle_reads()
+                        results[i] = await self._exec_tool(panel, name, args)
+                        continue
+                    key = (name, json.dumps(args, sort_keys=True, default=str))
+                    if key not in shared:
+                        shared[key] = asyncio.ensure_future(self._exec_tool(panel, name, args))
+                    reads.append((i, shared[key]))
+                await settle_reads()
+                if on_tool_activity:
+                    if len(batch) == 1:
+                        on_tool_activity("result", names[0], results[0])
+                    else:
+                        on_tool_activity("batch_result", names,
+                                         [(args, result) for (_, args), result in zip(batch, results)])
+                for name, result in zip(names, results):
+                    function_response_parts.append(
+                        types.Part.from_function_response(name=name, response=result)
+                    )
+                batch.clear()
+
             for fc in pending_function_calls:
                 if ps["cancelled"]:
                     break
 
                 tool_name = fc.name
-                tool_args = dict(fc.args) if fc.args else {}
+                tool_args = fc.args or {}  # Already a plain dict; nothing mutates it
                 total_tool_calls += 1
+                console.print(f"  [dim]Tool {tool_name} ({total_tool_calls}/{max_tool_calls}) [panel {panel}][/]")
+
+                if tool_name != "run_command":
+                    batch.append((tool_name, tool_args))
+                    continue
 
+                # Gate: require user approval for run_command. Calls before it
+                # finish first so the command sees their effects.
+                if batch:
+                    await run_batch()
                 if on_tool_activity:
                     on_tool_activity("start", tool_name, tool_args)
-
-                # Gate: require user approval for run_command
-                if tool_name == "run_command":
-                    ps["pending_command"] = tool_args.get("command", "")
-                    ps["pending_approval"] = asyncio.get_event_loop().create_future()
-                    if on_tool_activity:
-                        on_tool_activity("approval_request", tool_name, tool_args)
-                    try:
-                        approved = await ps["pending_approval"]
-                    except (asyncio.CancelledError, Exception):
-                        ps["pending_approval"] = None
-                        ps["pending_command"] = None
-                        break
+                ps["pending_command"] = tool_args.get("command", "")
+                ps["pending_approval"] = asyncio.get_running_loop().create_future()
+                if on_tool_activity:
+                    on_tool_activity("approval_request", tool_name, tool_args)
+                try:
+                    approved = await ps["pending_approval"]
+                except (asyncio.CancelledError, Exception):
                     ps["pending_approval"] = None
                     ps["pending_command"] = None
-                    if not approved:
-                        result = {"error": "Command denied by user."}
-                        if on_tool_activity:
-                            on_tool_activity("result", tool_name, result)
-                        console.print(f"  [red]Command denied (panel {panel})[/]")
-                        function_response_parts.append(
-                            types.Part.from_function_response(name=tool_name, response=result)
-                        )
-                        continue
-
-                _log.debug("panel %d tool %d/%d: executing %s", panel, total_tool_calls, max_tool_calls, tool_name)
-                executor = TOOL_DISPATCH.get(tool_name)
-                if executor:
-                    try:
-                        if asyncio.iscoroutinefunction(executor):
-                            result = await asyncio.wait_for(executor(**tool_args), timeout=45.0)
-                        else:
-                            result = executor(**tool_args)
-                    except asyncio.TimeoutError:
-                        _log.warning("panel %d tool %s timed out (45s)", panel, tool_name)
-                        result = {"error": f"Tool {tool_name} timed out (45s)"}
-                    except Exception as e:
-                        _log.error("panel %d tool %s error: %s", panel, tool_name, e)
-                        result = {"error": str(e)}
+                    break
+                ps["pending_approval"] = None
+                ps["pending_command"] = None
+                if approved:
+                    result = await self._exec_tool(panel, tool_name, tool_args)
                 else:
-                    result = {"error": f"Unknown tool: {tool_name}"}
-
-                has_error = "error" in result if isinstance(result, dict) else False
-                _log.debug("panel %d tool %s done — error=%s", panel, tool_name, has_error)
-
+                    result = {"error": "Command denied by user."}
+                    console.print(f"  [red]Command denied (panel {panel})[/]")
                 if on_tool_activity:
                     on_tool_activity("result", tool_name, result)
-
-                console.print(f"  [dim]Tool {tool_name} ({total_tool_calls}/{max_tool_calls}) [panel {panel}][/]")
                 function_response_parts.append(
                     types.Part.from_function_response(name=tool_name, response=result)
                 )
 
+            if batch and not ps["cancelled"]:
+                await run_batch()
+
             if ps["cancelled"] or not function_response_parts:
                 _log.debug("panel %d turn %d: loop ending — cancelled=%s, parts=%d",
                            panel, iteration + 1, ps["cancelled"], len(function_response_parts))
@@ -612,6 +911,7 @@ class SkillRouter:
 
             message = function_response_parts
 
+        full_response = "".join(response_parts)
         _log.debug("panel %d _run_code_turn done — %d turns, %d tool calls, response=%d chars",
                     panel, iteration + 1, total_tool_calls, len(full_response))
         return full_response
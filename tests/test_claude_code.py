@@ -0,0 +1,90 @@
+"""Tests for skills.claude_code display helpers.
+
+Tests cover:
+- Tool result truncation (line-based and char-based)
+- Content-block extraction from API result lists
+- Subagent progress: tool starts throttled, results always forwarded
+"""
+
+import pytest
+from claude_code_sdk import AssistantMessage, ToolResultBlock, ToolUseBlock, UserMessage
+
+from skills.claude_code import ClaudeCodeSession, _format_tool_result
+
+
+def _split_reference(text: str) -> str:
+    """Original split-based truncation the offset scan must reproduce."""
+    lines = text.split("\n")
+    if len(lines) > 30:
+        return "\n".join(lines[:20] + [f"  ... ({len(lines) - 23} more lines)"] + lines[-3:])
+    if len(text) > 1500:
+        return text[:1500] + "..."
+    return text
+
+
+class TestFormatToolResult:
+    """Tests for _format_tool_result."""
+
+    def test_none(self):
+        assert _format_tool_result("", None) == "(no output)"
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "",
+            "short",
+            "line\n" * 29,
+            "line\n" * 30,
+            "\n".join(f"line {i}" for i in range(31)),
+            "\n".join(f"line {i}" for i in range(5000)),
+            "\n" * 40,
+            "x" * 2000,
+            ("y" * 100 + "\n") * 20,
+        ],
+    )
+    def test_matches_split_reference(self, text):
+        assert _format_tool_result("", text) == _split_reference(text)
+
+    def test_long_output_keeps_head_and_tail(self):
+        text = "\n".join(f"line {i}" for i in range(100))
+        result = _format_tool_result("", text)
+        assert result.startswith("line 0\n")
+        assert "  ... (77 more lines)" in result
+        assert result.endswith("line 97\nline 98\nline 99")
+
+    def test_text_blocks_joined(self):
+        content = [
+            {"type": "text", "text": "first"},
+            {"type": "image", "source": {}},
+            {"type": "text", "text": "second"},
+        ]
+        assert _format_tool_result("", content) == "first\nsecond"
+
+    def test_non_text_blocks_summarized(self):
+        content = [{"type": "image"}, {"type": "document"}]
+        assert _format_tool_result("", content) == "(image, document content)"
+
+
+class TestSubagentEvents:
+    """Tests for tool activity forwarded from inside a Task subagent."""
+
+    def test_results_not_throttled(self):
+        session = ClaudeCodeSession(cwd=".")
+        events = []
+
+        def emit(kind, name, data):
+            events.append((kind, data.get("is_error")))
+
+        uses = [ToolUseBlock(id="task", name="Task", input={})]
+        uses += [ToolUseBlock(id=f"t{i}", name="Read", input={}) for i in range(3)]
+        session._on_assistant(AssistantMessage(content=uses, model="m"), None, emit)
+        results = [ToolResultBlock(tool_use_id=f"t{i}", content="ok", is_error=i == 2) for i in range(3)]
+        session._on_user(UserMessage(content=results), emit)
+        assert events == [
+            ("start", None),
+            ("subagent_tool", None),  # Later starts fall inside the emit interval
+            ("subagent_result", False),
+            ("subagent_result", False),
+            ("subagent_result", True),
+        ]
+        assert session._subagent_op_count == 3
@@ -0,0 +1,34 @@
+"""Tests for the Gemini code-assistant prompt and tool declarations.
+
+Tests cover:
+- System prompt size budget (it is sent with every uncached turn)
+- Core rules that must survive prompt compaction
+"""
+
+import re
+
+import pytest
+
+from skills.code_assistant import CODE_SYSTEM_PROMPT
+
+# The prose prompt was 3899 chars; the tagged rewrite must stay ≥30% smaller.
+PROMPT_CHAR_BUDGET = 2700
+
+
+class TestCodeSystemPrompt:
+    """Tests for CODE_SYSTEM_PROMPT."""
+
+    def test_within_budget(self):
+        assert len(CODE_SYSTEM_PROMPT) <= PROMPT_CHAR_BUDGET
+
+    @pytest.mark.parametrize("tag", ["narrate", "style", "tools", "scope", "safety"])
+    def test_sections_balanced(self, tag):
+        assert len(re.findall(f"<{tag}>", CODE_SYSTEM_PROMPT)) == 1
+        assert len(re.findall(f"</{tag}>", CODE_SYSTEM_PROMPT)) == 1
+
+    @pytest.mark.parametrize(
+        "rule",
+        ["sudo", "rm -rf", "approval gate", "read_file", "edit_file", "write_file", "Google Search"],
+    )
+    def test_keeps_core_rules(self, rule):
+        assert rule in CODE_SYSTEM_PROMPT
@@ -0,0 +1,196 @@
+"""Tests for skills.code_tools executors.
+
+Tests cover:
+- read_file caching and invalidation on write/edit/external change
+- search_files argv
+- Command blocklist
+- list_files hidden-path filtering and result cap
+- Path jail re-checked on every call
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from skills import code_tools
+
+
+@pytest.fixture
+def projects(tmp_path, monkeypatch):
+    monkeypatch.setattr(code_tools, "PROJECTS_DIR", tmp_path)
+    monkeypatch.setattr(code_tools, "_READ_CACHE", type(code_tools._READ_CACHE)())
+    return tmp_path
+
+
+class TestReadFileCache:
+    """Tests for read_file's (mtime, size)-validated cache."""
+
+    def test_repeat_read_served_from_cache(self, projects, monkeypatch):
+        (projects / "a.txt").write_text("one\ntwo")
+        first = code_tools.read_file("a.txt")
+
+        def fail(*args, **kwargs):
+            raise AssertionError("file re-read despite cache hit")
+
+        monkeypatch.setattr(code_tools.Path, "read_text", fail)
+        assert code_tools.read_file("a.txt") == first
+
+    def test_returns_copy(self, projects):
+        (projects / "a.txt").write_text("x")
+        code_tools.read_file("a.txt")["content"] = "mutated"
+        assert code_tools.read_file("a.txt")["content"] == "x"
+
+    def test_write_and_edit_invalidate(self, projects):
+        code_tools.write_file("a.txt", "old")
+        assert code_tools.read_file("a.txt")["content"] == "old"
+        code_tools.edit_file("a.txt", "old", "new")
+        assert code_tools.read_file("a.txt")["content"] == "new"
+        code_tools.write_file("a.txt", "fresh")
+        assert code_tools.read_file("a.txt")["content"] == "fresh"
+
+    def test_noop_edit_keeps_cache(self, projects):
+        code_tools.write_file("a.txt", "same same")
+        code_tools.read_file("a.txt")
+        result = code_tools.edit_file("a.txt", "same", "same")
+        assert result["replacements"] == 0
+        assert projects / "a.txt" in code_tools._READ_CACHE
+
+    def test_edit_replaces_first_only(self, projects):
+        code_tools.write_file("a.txt", "x-x-x")
+        code_tools.edit_file("a.txt", "x", "y")
+        assert (projects / "a.txt").read_text() == "y-x-x"
+
+    def test_external_change_detected(self, projects):
+        f = projects / "a.txt"
+        f.write_text("before")
+        code_tools.read_file("a.txt")
+        f.write_text("after!")
+        st = f.stat()
+        os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert code_tools.read_file("a.txt")["content"] == "after!"
+
+    def test_lru_bound(self, projects, monkeypatch):
+        monkeypatch.setattr(code_tools, "READ_CACHE_SIZE", 2)
+        for name in "abc":
+            (projects / name).write_text(name)
+            code_tools.read_file(name)
+        assert [p.name for p in code_tools._READ_CACHE] == ["b", "c"]
+
+    def test_large_file_reads_head_only(self, projects):
+        body = "".join(f"line {i}\n" for i in range(20_000))
+        (projects / "big.log").write_text(body)
+        result = code_tools.read_file("big.log")
+        assert result["lines"] == body.count("\n") + 1
+        assert result["content"].startswith(body[: code_tools.MAX_OUTPUT_CHARS])
+        assert result["content"].endswith(f"(truncated, {len(body)} total bytes)")
+
+    def test_missing_and_directory(self, projects):
+        (projects / "d").mkdir()
+        assert "error" in code_tools.read_file("nope.txt")
+        assert code_tools.read_file("d") == {"error": "Not a file: d"}
+
+
+@pytest.fixture
+def shell_calls(monkeypatch):
+    """Replace shell and ripgrep subprocesses with a recorder."""
+    calls = []
+
+    async def fake_run(command, work_dir):
+        calls.append((command, work_dir))
+        return {"exit_code": 0, "stdout": f"hit {len(calls)}"}
+
+    monkeypatch.setattr(code_tools, "_run_shell", fake_run)
+    monkeypatch.setattr(code_tools, "_run_exec", fake_run)
+    return calls
+
+
+class TestSearchFiles:
+    """Tests for search_files."""
+
+    def test_pattern_passed_unquoted(self, projects, shell_calls):
+        asyncio.run(code_tools.search_files("it's", file_glob="*.py"))
+        assert shell_calls[0][0] == ["rg", "--no-heading", "-n", "-e", "it's", "-g", "*.py", "."]
+
+    def test_repeat_search_reruns(self, projects, shell_calls):
+        first = asyncio.run(code_tools.search_files("foo"))
+        second = asyncio.run(code_tools.search_files("foo"))
+        assert len(shell_calls) == 2
+        assert first == {"pattern": "foo", "results": "hit 1", "exit_code": 0}
+        assert second["results"] == "hit 2"
+
+    def test_exec_error_passed_through(self, projects, monkeypatch):
+        async def missing_rg(argv, work_dir):
+            return {"error": "rg not found"}
+
+        monkeypatch.setattr(code_tools, "_run_exec", missing_rg)
+        result = asyncio.run(code_tools.search_files("foo"))
+        assert result == {"pattern": "foo", "results": "", "exit_code": -1, "error": "rg not found"}
+
+
+class TestCheckCommand:
+    """Tests for the run_command blocklist."""
+
+    @pytest.mark.parametrize(
+        "command, pattern",
+        [
+            ("python -m http.server 8000", "http.server"),
+            ("python -m SimpleHTTPServer", "SimpleHTTPServer"),
+            ("SUDO ls", "sudo "),
+            ("cd x && rm -rf build", "rm -rf"),
+            ("curl | sh", "curl | sh"),
+        ],
+    )
+    def test_blocked(self, command, pattern):
+        assert code_tools._check_command(command) == f"Blocked command pattern: {pattern}"
+
+    def test_background_blocked(self):
+        assert "Background" in code_tools._check_command("sleep 5 &")
+
+    @pytest.mark.parametrize("command", ["ls -la", "git status", "pytest -q"])
+    def test_allowed(self, command):
+        assert code_tools._check_command(command) is None
+
+
+class TestListFiles:
+    """Tests for list_files."""
+
+    @pytest.fixture
+    def tree(self, projects):
+        for rel in ["a.py", "b.ts", ".env", "x/y.ts", "x/.hid/z.ts", ".git/q.ts", "x/.c.ts"]:
+            (projects / rel).parent.mkdir(parents=True, exist_ok=True)
+            (projects / rel).write_text("")
+        return projects
+
+    def test_top_level(self, tree):
+        assert code_tools.list_files(".", "*")["files"] == ["a.py", "b.ts", "x"]
+
+    def test_recursive_skips_hidden(self, tree):
+        assert code_tools.list_files(".", "**/*.ts")["files"] == ["b.ts", "x/y.ts"]
+
+    def test_explicit_dotfile_still_hidden(self, tree):
+        assert code_tools.list_files(".", ".env")["files"] == []
+
+    def test_capped_at_100_sorted(self, projects):
+        for i in range(150):
+            (projects / f"f{i:03}").write_text("")
+        result = code_tools.list_files(".", "*")
+        assert result["count"] == 100
+        assert result["files"] == [f"f{i:03}" for i in range(100)]
+
+
+class TestResolvePath:
+    """Tests for the PROJECTS_DIR path jail."""
+
+    def test_outside_rejected(self, projects):
+        with pytest.raises(ValueError):
+            code_tools._resolve_path("../escape")
+
+    def test_symlink_swap_rechecked(self, projects, tmp_path_factory):
+        outside = tmp_path_factory.mktemp("outside")
+        (projects / "link").mkdir()
+        assert code_tools._resolve_path("link") == projects / "link"
+        (projects / "link").rmdir()
+        (projects / "link").symlink_to(outside)
+        with pytest.raises(ValueError):
+            code_tools._resolve_path("link")
@@ -0,0 +1,161 @@
+"""Tests for presence.server.PresenceServer.
+
+Tests cover:
+- Unknown message types and non-object frames ignored
+- Text frames out; text or binary frames in
+- Null fields falling back to their defaults
+- A reconnect keeping ownership of the user's presence
+"""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("msgspec")
+websockets = pytest.importorskip("websockets")
+
+from presence.server import PresenceServer  # noqa: E402
+
+
+def _run(scenario):
+    """Serve a fresh PresenceServer on a free port and run `scenario(server, url)`."""
+    async def main():
+        server = PresenceServer()
+        async with websockets.serve(server.handler, "127.0.0.1", 0) as ws_server:
+            port = ws_server.sockets[0].getsockname()[1]
+            try:
+                await scenario(server, f"ws://127.0.0.1:{port}")
+            finally:
+                for timer in server.grace_timers.values():
+                    timer.cancel()
+
+    asyncio.run(main())
+
+
+async def _recv(ws):
+    frame = await asyncio.wait_for(ws.recv(), timeout=2)
+    assert isinstance(frame, str)  # Every server frame is a text frame
+    return json.loads(frame)
+
+
+async def _connect(ws, user_id="u1", **fields):
+    await ws.send(json.dumps({"type": "connect", "user_id": user_id, **fields}))
+    return await _recv(ws)
+
+
+async def _settle(server, user_id, check):
+    """Wait for the server's handler to catch up with a client-side action."""
+    for _ in range(100):
+        if check(server.users.get(user_id)):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("server state never settled")
+
+
+class TestFrames:
+    """Tests for how inbound frames are decoded and outbound ones sent."""
+
+    def test_welcome_is_text(self):
+        async def scenario(server, url):
+            async with websockets.connect(url) as ws:
+                welcome = await _connect(ws)
+                assert welcome == {"type": "welcome", "your_id": "u1", "users": []}
+
+        _run(scenario)
+
+    def test_binary_frame_accepted(self):
+        async def scenario(server, url):
+            async with websockets.connect(url) as ws:
+                await ws.send(b'{"type":"connect","user_id":"u1"}')
+                assert (await _recv(ws))["type"] == "welcome"
+
+        _run(scenario)
+
+    @pytest.mark.parametrize("frame", ['{"type":"from_the_future","x":1}', '{"no_type":1}', "[1]", "42"])
+    def test_unrecognised_frame_ignored(self, frame):
+        async def scenario(server, url):
+            async with websockets.connect(url) as ws:
+                await _connect(ws)
+                await ws.send(frame)
+                await ws.send('{"type":"ping"}')
+                assert await _recv(ws) == {"type": "pong", "online_count": 1}
+
+        _run(scenario)
+
+    def test_invalid_json_reported(self):
+        async def scenario(server, url):
+            async with websockets.connect(url) as ws:
+                await ws.send("{not json")
+                assert await _recv(ws) == {"type": "error", "message": "Invalid JSON"}
+
+        _run(scenario)
+
+    def test_wrong_field_type_reported(self):
+        async def scenario(server, url):
+            async with websockets.connect(url) as ws:
+                await ws.send('{"type":"connect","user_id":5}')
+                assert (await _recv(ws))["type"] == "error"
+
+        _run(scenario)
+
+
+class TestNullFields:
+    """Tests for fields a client sends as null."""
+
+    def test_null_user_id_rejected(self):
+        async def scenario(server, url):
+            async with websockets.connect(url) as ws:
+                assert await _connect(ws, user_id=None) == {
+                    "type": "error", "message": "Missing user_id",
+                }
+
+        _run(scenario)
+
+    def test_null_display_name_defaults(self):
+        async def scenario(server, url):
+            async with websockets.connect(url) as ws:
+                assert (await _connect(ws, display_name=None, version=None))["type"] == "welcome"
+                assert server.users["u1"].display_name == "Unknown"
+
+        _run(scenario)
+
+    def test_null_activity_fields_default(self):
+        async def scenario(server, url):
+            async with websockets.connect(url) as ws:
+                await _connect(ws)
+                for status, activity, metadata in [("busy", "coding", {"lang": "py"}), (None, None, None)]:
+                    await ws.send(json.dumps({
+                        "type": "activity_update",
+                        "status": status, "activity": activity, "metadata": metadata,
+                    }))
+                await ws.send('{"type":"ping"}')
+                await _recv(ws)  # Pong: the updates before it have been handled
+                u = server.users["u1"]
+                assert (u.status, u.activity, u.metadata) == ("online", None, {})
+
+        _run(scenario)
+
+
+class TestReconnect:
+    """Tests for a user reconnecting before the old socket closes."""
+
+    def test_new_connection_keeps_ownership(self):
+        async def scenario(server, url):
+            async with websockets.connect(url) as first:
+                await _connect(first)
+                old_ws = server.users["u1"].ws
+                second = await websockets.connect(url)
+                await _connect(second)
+                new_ws = server.users["u1"].ws
+                assert new_ws is not old_ws
+            # The first socket is closed; its handler must not evict the second
+            await asyncio.sleep(0.05)
+            assert server.users["u1"].ws is new_ws
+            assert "u1" not in server.grace_timers
+
+            await second.close()
+            await _settle(server, "u1", lambda u: u.ws is None)
+            assert "u1" in server.grace_timers
+
+        _run(scenario)
@@ -0,0 +1,77 @@
+"""Tests for connectors.rate_limiter.
+
+Tests cover:
+- Request bucket pacing once the burst is spent
+- Token debt from charge() delaying the next request
+- pause() holding callers for a retry delay
+- Zero quotas meaning unlimited, negative ones rejected
+"""
+
+import asyncio
+
+import pytest
+
+from connectors import rate_limiter
+from connectors.rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock; asyncio.sleep advances it and records the delay."""
+    state = {"now": 1000.0, "sleeps": []}
+
+    async def fake_sleep(delay):
+        state["sleeps"].append(delay)
+        state["now"] += delay
+
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: state["now"])
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", fake_sleep)
+    return state
+
+
+class TestRateLimiter:
+    """Tests for RateLimiter."""
+
+    def test_burst_then_paced(self, clock):
+        limiter = RateLimiter(rpm=2, tpm=1000, period=60.0)
+
+        async def run():
+            for _ in range(3):
+                await limiter.wait()
+
+        asyncio.run(run())
+        assert clock["sleeps"] == [pytest.approx(30.0)]
+
+    def test_token_debt_delays_next_request(self, clock):
+        limiter = RateLimiter(rpm=100, tpm=600, period=60.0)
+        limiter.charge(900)  # 300 tokens over → 30s at 10 tokens/s
+        asyncio.run(limiter.wait())
+        assert clock["sleeps"] == [pytest.approx(30.0)]
+
+    def test_charge_within_budget_does_not_wait(self, clock):
+        limiter = RateLimiter(rpm=100, tpm=600, period=60.0)
+        limiter.charge(500)
+        asyncio.run(limiter.wait())
+        assert clock["sleeps"] == []
+
+    def test_pause(self, clock):
+        limiter = RateLimiter(rpm=100, tpm=600, period=60.0)
+        limiter.pause(12.0)
+        limiter.pause(5.0)  # Shorter pause doesn't shorten the first
+        asyncio.run(limiter.wait())
+        assert sum(clock["sleeps"]) == pytest.approx(12.0)
+
+    def test_zero_is_unlimited(self, clock):
+        limiter = RateLimiter(rpm=0, tpm=0, period=60.0)
+        limiter.charge(10_000)
+
+        async def run():
+            for _ in range(5):
+                await limiter.wait()
+
+        asyncio.run(run())
+        assert clock["sleeps"] == []
+
+    def test_negative_rejected(self):
+        with pytest.raises(ValueError):
+            RateLimiter(rpm=-1, tpm=1000)
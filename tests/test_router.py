@@ -0,0 +1,149 @@
+"""Tests for skills.router.SkillRouter.
+
+Tests cover:
+- Batched tool calls: call-order results, writes after reads, shared reads
+- Sync read-only tools overlapping on worker threads
+- UI index → panel id mapping across split and close
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import config
+from skills import router as router_mod
+
+
+def _chunk(text=None, calls=()):
+    parts = [SimpleNamespace(text=text, thought=None, function_call=None)] if text else []
+    parts += [
+        SimpleNamespace(text=None, thought=None, function_call=SimpleNamespace(name=n, args=a))
+        for n, a in calls
+    ]
+    return SimpleNamespace(
+        candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))],
+        usage_metadata=None,
+    )
+
+
+class FakeChat:
+    """Replays one turn of function calls, then a text reply; records what was sent."""
+
+    def __init__(self, calls):
+        self.calls = calls
+        self.sent = []
+
+    async def send_message_stream(self, message):
+        self.sent.append(message)
+        chunk = _chunk(calls=self.calls) if len(self.sent) == 1 else _chunk(text="done")
+
+        async def stream():
+            yield chunk
+
+        return stream()
+
+    def responses(self):
+        return [p.function_response.response for p in self.sent[1]]
+
+
+@pytest.fixture
+def router(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TOKEN_USAGE_DB", tmp_path / "usage.db")
+    return router_mod.SkillRouter()
+
+
+def _run(router, chat, executors, monkeypatch):
+    monkeypatch.setattr(router_mod, "TOOL_EXECUTORS", executors)
+    router._get_panel(1)["chat"] = chat
+    return asyncio.run(router._run_code_turn("go", panel=1))
+
+
+class TestToolBatch:
+    """Tests for how one turn's tool calls are executed."""
+
+    def test_results_in_call_order(self, router, monkeypatch):
+        async def search_files(delay):
+            await asyncio.sleep(delay)
+            return {"delay": delay}
+
+        chat = FakeChat([("search_files", {"delay": 0.05}), ("search_files", {"delay": 0.0})])
+        _run(router, chat, {"search_files": (search_files, True)}, monkeypatch)
+        assert chat.responses() == [{"delay": 0.05}, {"delay": 0.0}]
+
+    def test_write_waits_for_earlier_reads(self, router, monkeypatch):
+        state = {"v": 0, "reads_done": 0}
+
+        async def search_files(path):
+            await asyncio.sleep(0.02)
+            state["reads_done"] += 1
+            return {"v": state["v"]}
+
+        def write_file(path):
+            state["v"] += 1
+            return {"reads_done": state["reads_done"]}
+
+        chat = FakeChat([
+            ("search_files", {"path": "a"}),
+            ("search_files", {"path": "b"}),
+            ("write_file", {"path": "a"}),
+            ("search_files", {"path": "a"}),
+        ])
+        _run(router, chat, {"search_files": (search_files, True), "write_file": (write_file, False)},
+             monkeypatch)
+        assert chat.responses() == [{"v": 0}, {"v": 0}, {"reads_done": 2}, {"v": 1}]
+
+    def test_identical_reads_run_once(self, router, monkeypatch):
+        runs = []
+
+        def read_file(path):
+            runs.append(path)
+            return {"path": path}
+
+        chat = FakeChat([("read_file", {"path": "a"}), ("read_file", {"path": "a"}),
+                         ("read_file", {"path": "b"})])
+        _run(router, chat, {"read_file": (read_file, False)}, monkeypatch)
+        assert sorted(runs) == ["a", "b"]
+        assert chat.responses() == [{"path": "a"}, {"path": "a"}, {"path": "b"}]
+
+    def test_sync_reads_overlap(self, router, monkeypatch):
+        both_running = threading.Barrier(2, timeout=2)
+
+        def read_file(path):
+            both_running.wait()  # Raises BrokenBarrierError if the reads ran one at a time
+            return {"path": path}
+
+        chat = FakeChat([("read_file", {"path": "a"}), ("read_file", {"path": "b"})])
+        _run(router, chat, {"read_file": (read_file, False)}, monkeypatch)
+        assert chat.responses() == [{"path": "a"}, {"path": "b"}]
+
+
+class TestPanelIds:
+    """Tests for mapping the UI's dense panel indices to stable panel ids."""
+
+    def test_split_without_state_keeps_later_panels(self, router):
+        first = router.panel_id(0)
+        router._get_panel(first)["skill_name"] = "first"
+        router.open_panel()  # Split whose panel has no session state yet
+        third = router.open_panel()
+        router._get_panel(third)["skill_name"] = "third"
+        assert router.panel_id(2) == third
+        assert router._get_panel(router.panel_id(2))["skill_name"] == "third"
+
+    def test_close_shifts_indices_to_surviving_panels(self, router):
+        ids = [router.panel_id(0), router.open_panel(), router.open_panel()]
+        router.close_panel(ids[1])
+        assert [router.panel_id(0), router.panel_id(1)] == [ids[0], ids[2]]
+        assert router.list_panels() == [ids[0], ids[2]]
+
+    def test_ids_not_reused_after_close(self, router):
+        closed = router.open_panel()
+        router.close_panel(closed)
+        assert router.open_panel() != closed
+
+    def test_close_session_clears_order(self, router):
+        router.open_panel()
+        router.open_panel()
+        asyncio.run(router.close_session())
+        assert router.list_panels() == []
@@ -0,0 +1,34 @@
+"""Tests for connectors.token_tracker.
+
+Tests cover:
+- Batched inserts via record_many
+- record() as a single-row batch
+"""
+
+from connectors.token_tracker import TokenTracker
+
+
+class TestTokenTracker:
+    """Tests for TokenTracker writes."""
+
+    def test_record_many(self, tmp_path):
+        tracker = TokenTracker(tmp_path / "usage.db")
+        tracker.record_many([
+            ("2026-01-01T00:00:00", "flash", "code", 10, 5, 15),
+            ("2026-01-01T00:00:01", "pro", "skill", 20, 10, 30),
+        ])
+        assert tracker.get_totals() == {
+            "total_calls": 2, "total_prompt": 30, "total_completion": 15, "total_tokens": 45,
+        }
+        assert {r["model"] for r in tracker.get_by_model()} == {"flash", "pro"}
+
+    def test_record_many_empty(self, tmp_path):
+        tracker = TokenTracker(tmp_path / "usage.db")
+        tracker.record_many([])
+        assert tracker.get_totals()["total_calls"] == 0
+
+    def test_record(self, tmp_path):
+        tracker = TokenTracker(tmp_path / "usage.db")
+        tracker.record(model="flash", session_type="default",
+                       prompt_tokens=1, completion_tokens=2, total_tokens=3)
+        assert tracker.get_recent()[0]["total_tokens"] == 3
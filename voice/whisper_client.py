@@ -26,7 +26,7 @@ class WhisperClient:
         Returns:
             Transcribed text, or empty string on error.
         """
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         return await loop.run_in_executor(None, self._transcribe_sync, audio, sample_rate)
 
     def _transcribe_sync(self, audio: np.ndarray, sample_rate: int) -> str: